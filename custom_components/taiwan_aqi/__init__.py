@@ -1,5 +1,7 @@
 import logging # 導入 logging 模組，用於記錄日誌資訊 
 
+import voluptuous as vol # 導入 voluptuous 模組，用於驗證服務參數
+
 from copy import deepcopy # 從 copy 模組導入 deepcopy 函數，用於深度複製物件
 
 from homeassistant.config_entries import ConfigEntry # 從 Home Assistant 導入 ConfigEntry 類，表示一個配置條目
@@ -9,23 +11,60 @@ from homeassistant.helpers import config_validation as cv # 從 Home Assistant 
 from homeassistant.helpers import entity_registry as er # 從 Home Assistant 導入 entity_registry 模組，用於管理實體註冊
 from homeassistant.helpers import device_registry as dr # 從 Home Assistant 導入 device_registry 模組，用於管理設備註冊
 from homeassistant.helpers.event import async_track_time_change # 從 Home Assistant 導入 async_track_time_change 函數，用於跟蹤時間變化事件
+from homeassistant.helpers.dispatcher import async_dispatcher_send # 從 Home Assistant 導入 async_dispatcher_send 函數，用於通知配置條目已卸載
 
-from .coordinator import AQICoordinator # 從當前包導入 AQICoordinator 類，負責資料協調
+from .coordinator import AQICoordinator, configured_endpoints # 從當前包導入 AQICoordinator 類，負責資料協調，及取得端點列表的函數
+from .sensor import async_update_sites, async_apply_selection, site_selection # 從感測器平台導入增量套用選項變更及取得污染物選擇的函數
+from .websocket_api import async_register_websocket_commands # 從當前包導入 websocket 指令的註冊函數
+from .exporter import AQIMetricsView # 從當前包導入 Prometheus 指標的 HTTP 視圖
+from .profiler import RefreshProfiler # 從當前包導入 RefreshProfiler 類，負責按需分析刷新
 from .const import ( # 從當前包導入 const 模組中的常量
     DOMAIN, # 領域名稱，通常是整合的唯一識別碼
     CONF_SITEID, # 配置中用於站點ID的鍵
+    CONF_POLLUTANTS, # 配置中用於全域污染物列表的鍵
+    SENSOR_INFO, # 感測器資訊字典，其鍵即為所有感測器類型
     COORDINATOR, # 協調器物件的鍵
     SITEID, # 站點ID的鍵
+    POLLUTANTS, # 上次套用的污染物選擇的鍵
     TASK, # 定時任務的鍵
+    ADD_ENTITIES, # 感測器平台新增實體回呼的鍵
+    SIGNAL_ENTRY_UNLOADED, # 配置條目卸載的信號
     PLATFORM, # 平台名稱，例如 'sensor'
     UPDATE_INTERVAL, # 更新間隔時間
+    PROFILER, # 共用刷新分析器的鍵
+    SERVICE_PROFILE, # 效能分析服務的名稱
+    ATTR_REFRESHES, # 要分析的刷新次數參數
+    ATTR_MODE, # 分析模式參數
+    PROFILE_MODE_SAMPLING, # 取樣分析模式
+    PROFILE_MODE_DETERMINISTIC, # 決定性分析模式
 )
 
 CONFIG_SCHEMA = cv.removed(DOMAIN, raise_if_present=True) # 定義配置 schema，這裡表示舊的配置方式已被移除，如果存在則會拋出錯誤
 _LOGGER = logging.getLogger(__name__) # 獲取一個日誌記錄器實例，用於記錄此模組的日誌
+# 定義效能分析服務的參數 schema
+PROFILE_SCHEMA = vol.Schema(
+    {
+        vol.Optional(ATTR_REFRESHES, default=1): vol.All(vol.Coerce(int), vol.Range(min=1, max=20)),
+        vol.Optional(ATTR_MODE, default=PROFILE_MODE_SAMPLING): vol.In(
+            [PROFILE_MODE_SAMPLING, PROFILE_MODE_DETERMINISTIC]
+        ),
+    }
+)
 
 async def async_setup(hass: HomeAssistant, config: ConfigType) -> bool:
     """Set up global services for Taiwan AQI .""" # 設定台灣空氣品質監測的全局服務
+    async_register_websocket_commands(hass) # 註冊 websocket 快照與訂閱指令
+    hass.http.register_view(AQIMetricsView()) # 註冊 Prometheus 指標的 HTTP 視圖
+
+    # 所有協調器共用一個分析器，同時進行的刷新不會重複啟用 cProfile
+    hass.data[PROFILER] = RefreshProfiler(hass)
+
+    async def profile_service(call: ServiceCall) -> None:
+        """分析所有協調器接下來的刷新週期"""
+        hass.data[PROFILER].arm(call.data[ATTR_REFRESHES], call.data[ATTR_MODE])
+
+    # 註冊效能分析服務
+    hass.services.async_register(DOMAIN, SERVICE_PROFILE, profile_service, schema=PROFILE_SCHEMA)
     return True # 返回 True 表示設定成功
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
@@ -48,6 +87,7 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
         hass.data[DOMAIN][entry.entry_id] = {
             COORDINATOR: coordinator,
             SITEID: entry.data.get(CONF_SITEID),
+            POLLUTANTS: site_selection(entry.data),
             TASK: task,
         }
         # 執行協調器的首次資料刷新
@@ -66,11 +106,48 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
 async def update_listener(hass: HomeAssistant, entry: ConfigEntry) -> None:
     """Update listener.""" # 更新監聽器
     try:
-        # 當配置條目更新時，重新載入該配置條目
-        await hass.config_entries.async_reload(entry.entry_id)
+        entry_data = hass.data[DOMAIN][entry.entry_id]
+        # 只有選擇改變的感測器才會被停用或重新啟用，使用者在介面中自行啟用的感測器不受影響
+        old_selection = entry_data.get(POLLUTANTS, {})
+        entry_data[POLLUTANTS] = site_selection(entry.data)
+        if ADD_ENTITIES not in entry_data:
+            # 感測器平台尚未完成設定，無法增量更新，套用選擇的變更後改為重新載入該配置條目
+            async_apply_selection(hass, entry, old_selection)
+            await hass.config_entries.async_reload(entry.entry_id)
+            return
+
+        # 協調器在每次更新時從配置條目讀取 API 金鑰，因此更換金鑰不需要任何額外處理
+        # 端點列表變更時只替換資料來源的端點，保留已知端點的健康狀態
+        entry_data[COORDINATOR].source.set_endpoints(configured_endpoints(entry))
+        old_siteid = entry_data.get(SITEID, [])
+        new_siteid = entry.data.get(CONF_SITEID, [])
+        # 移除已取消站點的設備及其實體
+        _async_remove_devices(hass, entry, [id for id in old_siteid if id not in new_siteid])
+        # 新增站點的實體並套用污染物選擇，協調器及其快取資料保持不變
+        async_update_sites(hass, entry, [id for id in new_siteid if id not in old_siteid], old_selection)
+        entry_data[SITEID] = list(new_siteid)
     except Exception as e:
         _LOGGER.error(f"update_listener error: {e}") # 記錄錯誤日誌
 
+def _async_remove_devices(hass: HomeAssistant, entry: ConfigEntry, siteid: list) -> None:
+    """Remove the devices of the given sites.""" # 移除指定站點的設備
+    # 計算需要移除的設備識別符
+    del_dev_identifiers = {(DOMAIN, id) for id in siteid}
+    _LOGGER.debug(f"remove dev_identifiers: {del_dev_identifiers}") # 記錄要移除的設備識別符
+    if del_dev_identifiers:
+        # 獲取設備註冊表
+        dev_reg = dr.async_get(hass)
+        # 篩選出需要移除的設備
+        devices = [
+            device for device in
+            dr.async_entries_for_config_entry(dev_reg, entry.entry_id)
+            if device.identifiers & del_dev_identifiers
+        ]
+        # 移除設備，其下的實體也會一併從註冊表及狀態機中移除
+        for dev in devices:
+            dev_reg.async_remove_device(dev.id)
+            _LOGGER.debug(f"removed device: {dev.id}") # 記錄已移除的設備
+
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
     """Unload a config entry.""" # 卸載一個配置條目
     try:
@@ -86,28 +163,13 @@ async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
             # 獲取舊的站點ID和新的站點ID
             old_siteid = hass.data[DOMAIN][entry.entry_id].get(SITEID, [])
             new_siteid = entry.data.get(CONF_SITEID, [])
-            # 計算需要移除的設備識別符
-            del_dev_identifiers = {
-                (DOMAIN, id)
-                for id in old_siteid if id not in new_siteid
-            }
-            _LOGGER.debug(f"remove dev_identifiers: {del_dev_identifiers}") # 記錄要移除的設備識別符
-            if del_dev_identifiers:
-                # 獲取設備註冊表
-                dev_reg = dr.async_get(hass)
-                # 篩選出需要移除的設備
-                devices = [
-                    device for device in
-                    dr.async_entries_for_config_entry(dev_reg, entry.entry_id)
-                    if device.identifiers & del_dev_identifiers
-                ]
-                # 移除設備
-                for dev in devices:
-                    dev_reg.async_remove_device(dev.id)
-                    _LOGGER.debug(f"removed device: {dev.id}") # 記錄已移除的設備
+            # 移除已取消站點的設備
+            _async_remove_devices(hass, entry, [id for id in old_siteid if id not in new_siteid])
 
             # 從 hass.data 中移除當前配置條目的資料
             hass.data[DOMAIN].pop(entry.entry_id)
+            # 通知 websocket 訂閱結束，避免訂閱在條目卸載後停止更新卻沒有關閉
+            async_dispatcher_send(hass, SIGNAL_ENTRY_UNLOADED.format(entry.entry_id))
             # 如果 DOMAIN 下沒有其他配置條目了，則移除 DOMAIN 鍵
             if DOMAIN in hass.data and not hass.data[DOMAIN]:
                 hass.data.pop(DOMAIN)
@@ -124,15 +186,17 @@ async def async_reload_entry(hass: HomeAssistant, entry: ConfigEntry) -> None:
     # 呼叫 Home Assistant 的配置條目重新載入功能
     await hass.config_entries.async_reload(entry.entry_id)
 
-# async def async_migrate_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
-# """Migrate config entry.""" # 遷移配置條目
-# if entry.version > 2:
-# # 未來版本無法處理
-# return False
-#
-# if entry.version < 2:
-# # 舊版本更新資料
-# data = deepcopy(dict(entry.data))
-#
-# hass.config_entries.async_update_entry(entry, version=2, data=data)
-# return True
+async def async_migrate_entry(hass: HomeAssistant, entry: ConfigEntry) -> bool:
+    """Migrate config entry.""" # 遷移配置條目
+    if entry.version > 2:
+        # 未來版本無法處理
+        return False
+
+    if entry.version < 2:
+        # 舊版本的配置條目沒有污染物選擇，保留所有感測器類型為啟用，避免停用使用者已在使用的實體
+        data = deepcopy(dict(entry.data))
+        data.setdefault(CONF_POLLUTANTS, list(SENSOR_INFO))
+
+        hass.config_entries.async_update_entry(entry, version=2, data=data)
+        _LOGGER.debug(f"migrated config entry {entry.entry_id} to version 2") # 記錄遷移完成
+    return True
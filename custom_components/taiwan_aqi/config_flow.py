@@ -26,6 +26,8 @@ from homeassistant.helpers.selector import (
     # 選擇選擇器的模式（例如，DROPDOWN, LIST, RADIOS）。
     SelectOptionDict,
     # 選擇選項的字典格式。
+    BooleanSelector,
+    # 布林選擇器，用於勾選框。
 )
 
 from .const import (
@@ -38,6 +40,26 @@ from .const import (
     # 站點 ID 的配置鍵。
     SITEID_DICT,
     # 包含站點 ID 及其對應名稱的字典。
+    SITENAME_DICT,
+    # 包含站點名稱及其對應 ID 的反向字典。
+    CONF_POLLUTANTS,
+    # 全域污染物列表的配置鍵。
+    CONF_SITE_POLLUTANTS,
+    # 各站點污染物列表的配置鍵。
+    CONF_CUSTOMIZE_SITES,
+    # 是否為個別站點指定污染物的表單欄位。
+    CONF_PRIORITY_SITES,
+    # 優先註冊站點列表的配置鍵。
+    CONF_PRIORITY_POLLUTANTS,
+    # 優先註冊污染物列表的配置鍵。
+    CONF_ENDPOINTS,
+    # 等效 API 端點列表的配置鍵。
+    API_URL,
+    # 官方 API 的 URL，作為預設端點。
+    DEFAULT_POLLUTANTS,
+    # 預設啟用的核心感測器類型。
+    SENSOR_INFO,
+    # 感測器資訊字典，其鍵即為可選擇的污染物。
 )
 
 _LOGGER = logging.getLogger(__name__)
@@ -46,6 +68,9 @@ _LOGGER = logging.getLogger(__name__)
 TEXT_SELECTOR = TextSelector(TextSelectorConfig(type=TextSelectorType.TEXT))
 # 創建一個文本選擇器實例，配置為普通的文本輸入類型。
 
+ENDPOINT_SELECTOR = TextSelector(TextSelectorConfig(type=TextSelectorType.URL, multiple=True))
+# 創建一個可輸入多個 URL 的文本選擇器，依序列出等效的 API 端點。
+
 SITE_SELECTOR = SelectSelector(
 # 創建一個選擇選擇器實例。
     SelectSelectorConfig(
@@ -62,6 +87,61 @@ SITE_SELECTOR = SelectSelector(
     )
 )
 
+POLLUTANT_SELECTOR = SelectSelector(
+# 創建污染物（感測器類型）的多選選擇器。
+    SelectSelectorConfig(
+        options=list(SENSOR_INFO),
+        # 選項為 SENSOR_INFO 中定義的所有感測器類型。
+        mode=SelectSelectorMode.DROPDOWN,
+        # 設置選擇模式為下拉菜單。
+        custom_value=False,
+        # 不允許用戶輸入自定義值。
+        multiple=True
+        # 允許用戶選擇多個選項。
+    )
+)
+
+
+def _site_pollutants_schema(siteids, pollutants):
+# 建立個別站點污染物設定表單的模式。
+    """Return the schema of the per-site pollutant step."""
+    # 函式文檔字符串。
+    site_selector = SelectSelector(
+    # 僅列出已選擇的站點。
+        SelectSelectorConfig(
+            options=[SelectOptionDict(value=s_id, label=SITENAME_DICT[s_id]) for s_id in siteids],
+            mode=SelectSelectorMode.DROPDOWN,
+            custom_value=False,
+            multiple=True
+        )
+    )
+    return vol.Schema(
+        {
+            vol.Required(CONF_SITEID): site_selector,
+            # 要套用此設定的站點。
+            vol.Required(CONF_POLLUTANTS, default=pollutants): POLLUTANT_SELECTOR,
+            # 這些站點要啟用的污染物，預設為全域設定。
+            vol.Optional(CONF_CUSTOMIZE_SITES, default=False): BooleanSelector(),
+            # 是否繼續設定其他站點。
+        }
+    )
+
+
+def _validate(user_input):
+# 驗證主要表單的輸入，返回錯誤代碼或 None。
+    """Validate the main form."""
+    # 函式文檔字符串。
+    if not user_input[CONF_API_KEY]:
+        return "no_api"
+        # API 密鑰為空。
+    if not user_input[CONF_SITEID]:
+        return "no_id"
+        # 站點 ID 為空。
+    if not user_input[CONF_POLLUTANTS]:
+        return "no_pollutant"
+        # 污染物列表為空。
+    return None
+
 
 class TaiwanAQIConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 # 定義 TaiwanAQIConfigFlow 類，繼承自 config_entries.ConfigFlow，負責 Home Assistant 的配置流程。
@@ -69,7 +149,7 @@ class TaiwanAQIConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
     """Handle a config flow for Taiwan AQI."""
     # 類文檔字符串，說明此類用於處理台灣空氣品質監測（Taiwan AQI）的配置流程。
 
-    VERSION = 1
+    VERSION = 2
     # 定義配置流程的版本號。當配置流程的數據結構發生變化時，需要更新此版本號。
 
     @staticmethod
@@ -102,31 +182,48 @@ class TaiwanAQIConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
 
         if user_input is not None:
         # 如果用戶提交了表單數據。
-            if not user_input[CONF_API_KEY]:
-            # 如果 API 密鑰為空。
-                errors["base"] = "no_api"
-                # 在 errors 字典中添加一個錯誤，鍵為 "base"，值為 "no_api"。
-            elif not user_input[CONF_SITEID]:
-            # 如果站點 ID 為空。
-                errors["base"] = "no_id"
-                # 在 errors 字典中添加一個錯誤，鍵為 "base"，值為 "no_id"。
+            if error := _validate(user_input):
+            # 如果輸入驗證失敗。
+                errors["base"] = error
+                # 在 errors 字典中添加對應的錯誤。
             else:
-            # 如果 API 密鑰和站點 ID 都已提供。
-                return self.async_create_entry(
-                # 創建一個新的配置條目。
-                    title="TWAQ Monitor",
-                    # 配置條目的標題。
-                    data=user_input,
-                    # 配置條目中存儲的數據，即用戶輸入。
-                )
+            # 如果 API 密鑰、站點 ID 和污染物都已提供。
+                customize = user_input.pop(CONF_CUSTOMIZE_SITES, False)
+                # 取出是否要為個別站點指定污染物，此欄位不存入配置條目。
+                user_input[CONF_PRIORITY_SITES] = [
+                    s_id for s_id in user_input.get(CONF_PRIORITY_SITES, [])
+                    if s_id in user_input[CONF_SITEID]
+                ]
+                # 優先站點只保留已選擇的站點。
+                user_input[CONF_ENDPOINTS] = [
+                    url.strip() for url in user_input.get(CONF_ENDPOINTS, []) if url.strip()
+                ] or [API_URL]
+                # 移除空白的端點，全部為空時使用官方 API。
+                self._data = {**user_input, CONF_SITE_POLLUTANTS: {}}
+                # 暫存用戶輸入，個別站點設定預設為空。
+                if customize:
+                    return await self.async_step_site_pollutants()
+                    # 進入個別站點設定步驟。
+                return self._async_finish()
+                # 直接創建配置條目。
 
         schema = vol.Schema(
         # 創建一個 voluptuous 模式 (schema) 來定義表單的結構和驗證規則。
             {
                 vol.Required(CONF_API_KEY): TEXT_SELECTOR,
                 # 必填字段 CONF_API_KEY，使用 TEXT_SELECTOR 顯示為文本輸入框。
-                vol.Required(CONF_SITEID): SITE_SELECTOR
+                vol.Required(CONF_SITEID): SITE_SELECTOR,
                 # 必填字段 CONF_SITEID，使用 SITE_SELECTOR 顯示為下拉選擇框（多選）。
+                vol.Required(CONF_POLLUTANTS, default=DEFAULT_POLLUTANTS): POLLUTANT_SELECTOR,
+                # 必填字段 CONF_POLLUTANTS，預設只啟用核心感測器。
+                vol.Optional(CONF_PRIORITY_SITES, default=[]): SITE_SELECTOR,
+                # 選填字段 CONF_PRIORITY_SITES，啟動時優先註冊這些站點的感測器。
+                vol.Optional(CONF_PRIORITY_POLLUTANTS, default=[]): POLLUTANT_SELECTOR,
+                # 選填字段 CONF_PRIORITY_POLLUTANTS，啟動時優先註冊這些污染物的感測器。
+                vol.Optional(CONF_ENDPOINTS, default=[API_URL]): ENDPOINT_SELECTOR,
+                # 選填字段 CONF_ENDPOINTS，預設只使用官方 API。
+                vol.Optional(CONF_CUSTOMIZE_SITES, default=False): BooleanSelector(),
+                # 是否為個別站點指定不同的污染物。
             }
         )
 
@@ -140,6 +237,57 @@ class TaiwanAQIConfigFlow(config_entries.ConfigFlow, domain=DOMAIN):
             # 要顯示的錯誤信息。
         )
 
+    async def async_step_site_pollutants(self, user_input=None):
+    # 異步方法，處理個別站點污染物設定的步驟。
+        """Assign pollutants to individual sites."""
+        # 方法文檔字符串，說明此方法為個別站點指定污染物。
+        errors = _update_site_pollutants(self._data, user_input)
+        # 套用用戶輸入並取得驗證錯誤。
+
+        if user_input is not None and not errors and not user_input.get(CONF_CUSTOMIZE_SITES):
+        # 如果輸入有效且不需要繼續設定其他站點。
+            return self._async_finish()
+            # 創建配置條目。
+
+        return self.async_show_form(
+        # 顯示個別站點設定表單。
+            step_id="site_pollutants",
+            data_schema=_site_pollutants_schema(self._data[CONF_SITEID], self._data[CONF_POLLUTANTS]),
+            errors=errors,
+        )
+
+    @callback
+    def _async_finish(self):
+    # 創建配置條目。
+        """Create the config entry."""
+        # 方法文檔字符串。
+        return self.async_create_entry(
+        # 創建一個新的配置條目。
+            title="TWAQ Monitor",
+            # 配置條目的標題。
+            data=self._data,
+            # 配置條目中存儲的數據。
+        )
+
+
+def _update_site_pollutants(data, user_input):
+# 將個別站點表單的輸入套用到暫存的配置資料，返回錯誤字典。
+    """Apply a submitted per-site pollutant form to data."""
+    # 函式文檔字符串。
+    if user_input is None:
+        return {}
+        # 尚未提交表單，沒有錯誤。
+    if not user_input[CONF_SITEID]:
+        return {"base": "no_id"}
+        # 未選擇任何站點。
+    if not user_input[CONF_POLLUTANTS]:
+        return {"base": "no_pollutant"}
+        # 未選擇任何污染物。
+    for s_id in user_input[CONF_SITEID]:
+        data[CONF_SITE_POLLUTANTS][s_id] = list(user_input[CONF_POLLUTANTS])
+        # 為每個選擇的站點記錄其污染物列表。
+    return {}
+
 
 class TaiwanAQIOptionsFlow(config_entries.OptionsFlow):
 # 定義 TaiwanAQIOptionsFlow 類，繼承自 config_entries.OptionsFlow，用於處理已配置集成的選項。
@@ -156,37 +304,69 @@ class TaiwanAQIOptionsFlow(config_entries.OptionsFlow):
 
         if user_input is not None:
         # 如果用戶提交了表單數據。
-            if not user_input[CONF_API_KEY]:
-            # 如果 API 密鑰為空。
-                errors["base"] = "no_api"
-                # 在 errors 字典中添加一個錯誤，鍵為 "base"，值為 "no_api"。
-            elif not user_input[CONF_SITEID]:
-            # 如果站點 ID 為空。
-                errors["base"] = "no_id"
-                # 在 errors 字典中添加一個錯誤，鍵為 "base"，值為 "no_id"。
+            if error := _validate(user_input):
+            # 如果輸入驗證失敗。
+                errors["base"] = error
+                # 在 errors 字典中添加對應的錯誤。
             else:
-            # 如果 API 密鑰和站點 ID 都已提供。
-                # 更新選項
-                self.hass.config_entries.async_update_entry(
-                # 調用 Home Assistant 的配置條目管理器來更新現有的配置條目。
-                    self.config_entry, data=user_input
-                    # 指定要更新的 config_entry 和新的數據 user_input。
-                )
-                return self.async_create_entry(title=None, data=None)
-                # 創建一個不帶標題和數據的空條目，表示選項已成功更新並關閉選項流程。
+            # 如果 API 密鑰、站點 ID 和污染物都已提供。
+                customize = user_input.pop(CONF_CUSTOMIZE_SITES, False)
+                # 取出是否要為個別站點指定污染物，此欄位不存入配置條目。
+                user_input[CONF_PRIORITY_SITES] = [
+                    s_id for s_id in user_input.get(CONF_PRIORITY_SITES, [])
+                    if s_id in user_input[CONF_SITEID]
+                ]
+                # 優先站點只保留已選擇的站點。
+                user_input[CONF_ENDPOINTS] = [
+                    url.strip() for url in user_input.get(CONF_ENDPOINTS, []) if url.strip()
+                ] or [API_URL]
+                # 移除空白的端點，全部為空時使用官方 API。
+                old_site_conf = self.config_entry.data.get(CONF_SITE_POLLUTANTS) or {}
+                # 現有的個別站點設定。
+                self._data = {
+                    **user_input,
+                    CONF_SITE_POLLUTANTS: {
+                        s_id: pollutants for s_id, pollutants in old_site_conf.items()
+                        if s_id in user_input[CONF_SITEID]
+                    },
+                    # 保留仍被選擇之站點的個別設定，移除已取消站點的設定。
+                }
+                if customize:
+                    return await self.async_step_site_pollutants()
+                    # 進入個別站點設定步驟。
+                return self._async_finish()
+                # 直接更新配置條目。
 
         old_apikey = self.config_entry.data.get(CONF_API_KEY)
         # 從現有的配置條目中獲取舊的 API 密鑰。
         old_siteid = self.config_entry.data.get(CONF_SITEID, [])
         # 從現有的配置條目中獲取舊的站點 ID，如果不存在則默認為空列表。
+        old_pollutants = self.config_entry.data.get(CONF_POLLUTANTS, list(SENSOR_INFO))
+        # 從現有的配置條目中獲取舊的污染物列表，如果不存在（升級前建立的條目）則為所有類型。
+        old_priority = self.config_entry.data.get(CONF_PRIORITY_SITES, [])
+        # 從現有的配置條目中獲取舊的優先站點列表，如果不存在則默認為空列表。
+        old_priority_pollutants = self.config_entry.data.get(CONF_PRIORITY_POLLUTANTS, [])
+        # 從現有的配置條目中獲取舊的優先污染物列表，如果不存在則默認為空列表。
+        old_endpoints = self.config_entry.data.get(CONF_ENDPOINTS) or [API_URL]
+        # 從現有的配置條目中獲取舊的端點列表，如果不存在則使用官方 API。
 
         schema = vol.Schema(
         # 創建一個 voluptuous 模式 (schema) 來定義選項表單的結構和驗證規則。
             {
                 vol.Required(CONF_API_KEY, default=old_apikey): TEXT_SELECTOR,
                 # 必填字段 CONF_API_KEY，默認為舊的 API 密鑰，使用 TEXT_SELECTOR 顯示。
-                vol.Required(CONF_SITEID, default=old_siteid): SITE_SELECTOR
+                vol.Required(CONF_SITEID, default=old_siteid): SITE_SELECTOR,
                 # 必填字段 CONF_SITEID，默認為舊的站點 ID 列表，使用 SITE_SELECTOR 顯示。
+                vol.Required(CONF_POLLUTANTS, default=old_pollutants): POLLUTANT_SELECTOR,
+                # 必填字段 CONF_POLLUTANTS，默認為舊的污染物列表。
+                vol.Optional(CONF_PRIORITY_SITES, default=old_priority): SITE_SELECTOR,
+                # 選填字段 CONF_PRIORITY_SITES，默認為舊的優先站點列表。
+                vol.Optional(CONF_PRIORITY_POLLUTANTS, default=old_priority_pollutants): POLLUTANT_SELECTOR,
+                # 選填字段 CONF_PRIORITY_POLLUTANTS，默認為舊的優先污染物列表。
+                vol.Optional(CONF_ENDPOINTS, default=old_endpoints): ENDPOINT_SELECTOR,
+                # 選填字段 CONF_ENDPOINTS，默認為舊的端點列表。
+                vol.Optional(CONF_CUSTOMIZE_SITES, default=False): BooleanSelector(),
+                # 是否為個別站點指定不同的污染物。
             }
         )
 
@@ -199,3 +379,35 @@ class TaiwanAQIOptionsFlow(config_entries.OptionsFlow):
             errors=errors,
             # 要顯示的錯誤信息。
         )
+
+    async def async_step_site_pollutants(self, user_input=None):
+    # 異步方法，處理個別站點污染物設定的步驟。
+        """Assign pollutants to individual sites."""
+        # 方法文檔字符串，說明此方法為個別站點指定污染物。
+        errors = _update_site_pollutants(self._data, user_input)
+        # 套用用戶輸入並取得驗證錯誤。
+
+        if user_input is not None and not errors and not user_input.get(CONF_CUSTOMIZE_SITES):
+        # 如果輸入有效且不需要繼續設定其他站點。
+            return self._async_finish()
+            # 更新配置條目。
+
+        return self.async_show_form(
+        # 顯示個別站點設定表單。
+            step_id="site_pollutants",
+            data_schema=_site_pollutants_schema(self._data[CONF_SITEID], self._data[CONF_POLLUTANTS]),
+            errors=errors,
+        )
+
+    @callback
+    def _async_finish(self):
+    # 更新配置條目並關閉選項流程。
+        """Store the options in the config entry."""
+        # 方法文檔字符串。
+        self.hass.config_entries.async_update_entry(
+        # 調用 Home Assistant 的配置條目管理器來更新現有的配置條目。
+            self.config_entry, data=self._data
+            # 指定要更新的 config_entry 和新的數據。
+        )
+        return self.async_create_entry(title=None, data=None)
+        # 創建一個不帶標題和數據的空條目，表示選項已成功更新並關閉選項流程。
@@ -12,21 +12,73 @@ DOMAIN = "taiwan_aqi"
 # 配置項：API 金鑰的名稱。
 CONF_API_KEY = "api_key" 
 # 配置項：站點 ID 的名稱。
-CONF_SITEID = "siteID" 
+CONF_SITEID = "siteID"
+# 配置項：全域啟用的污染物 (感測器類型) 列表。
+CONF_POLLUTANTS = "pollutants"
+# 配置項：各站點個別指定的污染物列表，鍵是站點 ID，值是污染物列表。
+CONF_SITE_POLLUTANTS = "site_pollutants"
+# 表單欄位：是否繼續為個別站點指定污染物。
+CONF_CUSTOMIZE_SITES = "customize_sites"
+# 配置項：優先註冊的站點列表。
+CONF_PRIORITY_SITES = "priority_sites"
+# 配置項：優先註冊的污染物（感測器類型）列表。
+CONF_PRIORITY_POLLUTANTS = "priority_pollutants"
+# 配置項：依優先順序排列的等效 API 端點列表（官方 API、鏡像或本地快取代理）。
+CONF_ENDPOINTS = "endpoints"
 # 協調器名稱，用於資料更新的協調器。
 COORDINATOR = "COORDINATOR" 
 # 站點 ID 的變數名。
 SITEID = "SITEID" 
+# 每個站點上次套用的污染物選擇的變數名，選項變更時用來比對哪些感測器的選擇改變了。
+POLLUTANTS = "POLLUTANTS"
+# 實體註冊表選項中標記感測器因取消選擇而由整合停用的鍵，與 pref_disable_new_entities 停用的實體區分。
+OPTION_DESELECTED = "deselected"
 # 定時任務的變數名。
 TASK = "TIMER_TASK" 
+# 感測器平台的 async_add_entities 回呼的變數名，用於在不重新載入的情況下新增實體。
+ADD_ENTITIES = "ADD_ENTITIES"
+# websocket API 欄式快照快取的變數名。
+SNAPSHOT = "SNAPSHOT"
+# 配置條目卸載時發送的 dispatcher 信號，以條目 ID 格式化，用於結束 websocket 訂閱。
+SIGNAL_ENTRY_UNLOADED = f"{DOMAIN}_entry_unloaded_{{}}"
+# 所有協調器共用的刷新分析器在 hass.data 中的鍵。
+PROFILER = f"{DOMAIN}_profiler"
 # 台灣環境部空氣品質監測資料的 API URL。
 API_URL = "https://data.moenv.gov.tw/api/v2/aqx_p_432" 
+# 單一端點請求的逾時秒數。
+REQUEST_TIMEOUT = 30
+# 對沖請求：以過去請求延遲的此百分位數作為發出第二個請求前的等待時間。
+HEDGE_PERCENTILE = 0.9
+# 對沖請求：計算百分位數時保留的最近延遲樣本數。
+HEDGE_SAMPLES = 50
+# 對沖請求：開始使用百分位數前所需的最少樣本數。
+HEDGE_MIN_SAMPLES = 5
+# 對沖請求：樣本不足時使用的預設等待秒數。
+HEDGE_DEFAULT_DELAY = 3.0
+# 對沖請求：等待時間的下限秒數，避免過早發出多餘的請求。
+HEDGE_MIN_DELAY = 0.2
+# 端點延遲的指數移動平均權重。
+LATENCY_EWMA_ALPHA = 0.3
+# 效能分析服務的名稱。
+SERVICE_PROFILE = "profile"
+# 效能分析服務的參數：要分析的刷新次數。
+ATTR_REFRESHES = "refreshes"
+# 效能分析服務的參數：分析模式。
+ATTR_MODE = "mode"
+# 取樣分析模式，輸出 flamegraph 可讀取的 folded 堆疊檔案。
+PROFILE_MODE_SAMPLING = "sampling"
+# 決定性分析模式，輸出 pstats 檔案。
+PROFILE_MODE_DETERMINISTIC = "deterministic"
+# 取樣分析的間隔秒數。
+PROFILE_SAMPLE_INTERVAL = 0.005
 # Home Assistant 請求時使用的 User-Agent 字串，用於識別客戶端。
 HA_USER_AGENT = "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) HomeAssistant/HA-TaiwanAQI" 
 # 資料更新間隔設定為 11 分鐘。
 UPDATE_INTERVAL = timedelta(minutes=11) 
 # 此整合支援的平台列表，這裡指定為感測器 (Platform.SENSOR)。
 PLATFORM = [Platform.SENSOR] 
+# 每批次註冊的感測器實體數量，批次之間會讓出事件循環。
+ADD_CHUNK_SIZE = 50
 
 # 台灣空氣品質監測站點 ID 的字典，鍵是站點名稱 (中文)，值是對應的站點 ID (字串)。
 SITEID_DICT = { 
@@ -243,3 +295,12 @@ SENSOR_INFO = {
         "icon": None, # 圖標：無
     },
 }
+
+# 預設啟用的核心感測器類型，其餘類型會以停用狀態建立，使用者可自行於介面中啟用。
+DEFAULT_POLLUTANTS = [
+    "aqi", # 空氣品質指標
+    "pollutant", # 主要污染物
+    "status", # 空氣品質狀態
+    "pm2.5", # 細懸浮微粒
+    "pm10", # 懸浮微粒
+]
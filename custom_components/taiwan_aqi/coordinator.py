@@ -0,0 +1,68 @@
+import logging # 導入 logging 模組，用於記錄日誌資訊
+from contextlib import nullcontext # 導入 nullcontext，未分析時等待網路不需任何處理
+
+from homeassistant.config_entries import ConfigEntry # 從 Home Assistant 導入 ConfigEntry 類，表示一個配置條目
+from homeassistant.core import HomeAssistant # 從 Home Assistant 導入 HomeAssistant 核心物件
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed # 導入資料更新協調器及更新失敗異常
+
+from .source import AQISource # 從當前包導入 AQISource 類，負責對沖請求多個端點
+from .const import ( # 從當前包導入 const 模組中的常量
+    DOMAIN, # 領域名稱
+    API_URL, # 官方 API 的 URL
+    CONF_API_KEY, # 配置中用於 API 金鑰的鍵
+    CONF_ENDPOINTS, # 配置中用於端點列表的鍵
+    CONF_SITEID, # 配置中用於站點ID的鍵
+    PROFILER, # 共用刷新分析器的鍵
+)
+
+_LOGGER = logging.getLogger(__name__) # 獲取一個日誌記錄器實例，用於記錄此模組的日誌
+
+
+def configured_endpoints(entry: ConfigEntry) -> list:
+    """Return the endpoints of a config entry.""" # 返回配置條目的端點列表，未設定時使用官方 API
+    return entry.data.get(CONF_ENDPOINTS) or [API_URL]
+
+
+class AQICoordinator(DataUpdateCoordinator):
+    """Coordinate the national AQI payload of all stations.""" # 協調全國所有測站的空氣品質資料
+
+    def __init__(self, hass: HomeAssistant, entry: ConfigEntry, update_interval) -> None:
+        super().__init__(
+            hass,
+            _LOGGER,
+            name=DOMAIN, # 協調器名稱
+            update_interval=update_interval, # 設定資料更新間隔
+        )
+        self.config_entry = entry # 保存配置條目，每次更新時讀取最新的 API 金鑰
+        self.source = AQISource(hass, configured_endpoints(entry)) # 建立對沖請求的資料來源
+        self.profiler = hass.data[PROFILER] # 所有協調器共用的按需分析器，未啟用時不執行任何分析
+        self._waiting = nullcontext # 等待網路回應時使用的上下文，分析時暫停分析器
+        self._missing_siteid = set() # 上次刷新時資料中缺少的已配置站點
+
+    async def _async_refresh(self, *args, **kwargs):
+        """Refresh data, profiling it when requested.""" # 刷新資料，涵蓋抓取、解碼、索引及實體更新，需要時進行分析
+        if not self.profiler.start(): # 未啟用分析時只多一次屬性檢查
+            return await super()._async_refresh(*args, **kwargs)
+        self._waiting = self.profiler.waiting
+        try:
+            return await super()._async_refresh(*args, **kwargs)
+        finally:
+            self._waiting = nullcontext
+            await self.profiler.async_stop()
+
+    async def _async_update_data(self):
+        """Fetch data from API.""" # 從 API 取得資料
+        try:
+            payload = await self.source.async_fetch(self.config_entry.data[CONF_API_KEY], self._waiting)
+        except Exception as err:
+            # 所有端點都失敗時拋出更新失敗異常
+            raise UpdateFailed(f"Failed to fetch data: {err}") from err
+        # 以站點 ID 為鍵建立字典，每次更新都是新的物件
+        data = {record["siteid"]: record for record in payload["records"] if "siteid" in record}
+        # 每次刷新只檢查一次缺少的站點，且只在缺少的站點改變時記錄，避免每個實體重複記錄
+        missing = {id for id in self.config_entry.data.get(CONF_SITEID, []) if id not in data}
+        if missing != self._missing_siteid:
+            if missing:
+                _LOGGER.warning("Site IDs missing from the data: %s", sorted(missing))
+            self._missing_siteid = missing
+        return data
@@ -0,0 +1,96 @@
+"""Prometheus exporter for Taiwan AQI.""" # 以 Prometheus 文字格式輸出所有測站讀數的 HTTP 端點。
+
+from __future__ import annotations # 啟用延遲評估的型別提示。
+
+import logging # 導入 logging 模組，用於記錄日誌資訊。
+from types import MappingProxyType # 導入 MappingProxyType，用於建立唯讀的空資料常量。
+
+from aiohttp import web # 導入 aiohttp 的 web 模組，用於建立 HTTP 回應。
+
+from homeassistant.components.http import KEY_HASS, HomeAssistantView # 導入 Home Assistant 的 HTTP 視圖基礎類別及取得 hass 物件的鍵。
+from homeassistant.components.sensor import SensorStateClass # 導入感測器狀態類別，用於挑選數值型的讀數。
+
+from .const import ( # 從當前包導入常量。
+    DOMAIN, # 整合的領域名稱。
+    COORDINATOR, # 協調器物件的鍵。
+    SENSOR_INFO, # 感測器資訊字典。
+)
+
+_LOGGER = logging.getLogger(__name__) # 獲取此模組的日誌記錄器。
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8" # Prometheus 文字格式的內容類型。
+# 首次刷新前協調器資料為 None 時使用的同一個空資料物件，讓快取的同一性檢查仍能命中。
+NO_DATA = MappingProxyType({})
+
+# 只有測量值型的感測器類型可以輸出為 gauge，鍵為資料欄位，值為指標名稱。
+METRICS = {
+    key: f"{DOMAIN}_{key.replace('.', '_')}"
+    for key, config in SENSOR_INFO.items()
+    if config["sc"] == SensorStateClass.MEASUREMENT
+}
+
+
+def _label(value) -> str:
+    """Escape a label value.""" # 依照 Prometheus 格式跳脫標籤值。
+    return str(value or "").replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render(data: dict) -> str:
+    """Render the coordinator data in Prometheus exposition format.""" # 將協調器資料轉換為 Prometheus 文字格式。
+    labels = {
+        s_id: f'siteid="{_label(s_id)}",sitename="{_label(record.get("sitename"))}",'
+              f'county="{_label(record.get("county"))}"'
+        for s_id, record in data.items()
+    } # 每個站點的標籤只需組合一次。
+    lines = []
+    for key, metric in METRICS.items(): # 每種污染物一個指標族。
+        lines.append(f"# HELP {metric} Taiwan AQI {key} reading.")
+        lines.append(f"# TYPE {metric} gauge")
+        for s_id, record in data.items():
+            try:
+                value = float(record.get(key))
+            except (TypeError, ValueError): # 空值或無效值不輸出。
+                continue
+            lines.append(f"{metric}{{{labels[s_id]}}} {value}")
+    lines.append("")
+    return "\n".join(lines)
+
+
+class AQIMetricsView(HomeAssistantView):
+    """Serve the readings of all stations to Prometheus.""" # 提供所有測站讀數給 Prometheus 抓取。
+
+    url = f"/api/{DOMAIN}/metrics" # 視圖的 URL。
+    name = f"api:{DOMAIN}:metrics" # 視圖的名稱。
+
+    def __init__(self) -> None:
+        self._sources = () # 目前快取所對應的各配置條目協調器資料物件。
+        self._publishtime = None # 目前快取所對應的站點與發布時間。
+        self._body = b"" # 快取的輸出內容。
+
+    def _render(self, sources: tuple) -> bytes:
+        """Return the cached body, rendering it only for new publishtimes.""" # 返回快取的內容，只有發布時間更新時才重新產生。
+        if len(sources) == len(self._sources) and all(
+            data is cached for data, cached in zip(sources, self._sources)
+        ): # 所有協調器資料皆未變更，直接使用快取。
+            return self._body
+        # 每個協調器都保存全國資料，以站點 ID 合併，同一站點保留發布時間最新的記錄，避免重複輸出序列
+        merged = {}
+        for data in sources:
+            for s_id, record in data.items():
+                current = merged.get(s_id)
+                if current is None or (record.get("publishtime") or "") > (current.get("publishtime") or ""):
+                    merged[s_id] = record
+        publishtime = frozenset((s_id, record.get("publishtime")) for s_id, record in merged.items())
+        if publishtime != self._publishtime: # 有新的發布時間才重新產生。
+            self._body = render(merged).encode()
+            self._publishtime = publishtime
+        self._sources = sources
+        return self._body
+
+    async def get(self, request: web.Request) -> web.Response:
+        """Return the metrics of all stations.""" # 返回所有測站的指標，每個指標族只宣告一次。
+        hass = request.app[KEY_HASS]
+        sources = tuple(
+            entry_data[COORDINATOR].data or NO_DATA for entry_data in hass.data.get(DOMAIN, {}).values()
+        )
+        return web.Response(body=self._render(sources), headers={"Content-Type": CONTENT_TYPE})
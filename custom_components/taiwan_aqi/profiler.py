@@ -0,0 +1,158 @@
+"""On-demand profiling of coordinator refreshes.""" # 針對協調器刷新的按需效能分析。
+
+from __future__ import annotations # 啟用延遲評估的型別提示。
+
+import cProfile # 導入 cProfile，用於決定性分析。
+import logging # 導入 logging 模組，用於記錄日誌資訊。
+import sys # 導入 sys，用於取樣事件循環執行緒的堆疊。
+import threading # 導入 threading，用於在背景執行緒中取樣。
+from collections import Counter # 導入 Counter，用於統計相同堆疊的次數。
+from contextlib import contextmanager # 導入 contextmanager，用於在等待網路時暫停分析。
+from time import strftime # 導入 strftime，用於產生輸出檔名。
+
+from homeassistant.core import HomeAssistant # 導入 HomeAssistant 核心物件。
+
+from .const import ( # 從當前包導入常量。
+    DOMAIN, # 整合的領域名稱。
+    PROFILE_MODE_DETERMINISTIC, # 決定性分析模式。
+    PROFILE_SAMPLE_INTERVAL, # 取樣間隔秒數。
+)
+
+_LOGGER = logging.getLogger(__name__) # 獲取此模組的日誌記錄器。
+
+
+class StackSampler:
+    """Periodically sample the stack of one thread.""" # 定期取樣指定執行緒的呼叫堆疊。
+
+    def __init__(self, thread_id: int) -> None:
+        self._thread_id = thread_id # 要取樣的執行緒，即事件循環執行緒。
+        self._stop = threading.Event() # 停止取樣執行緒的事件。
+        self._active = threading.Event() # 是否記錄取樣，暫停時取樣執行緒保持執行但不記錄。
+        self._thread = None # 取樣執行緒。
+        self.stacks = Counter() # 每個堆疊被取樣到的次數。
+
+    def _run(self) -> None:
+        while not self._stop.wait(PROFILE_SAMPLE_INTERVAL):
+            if not self._active.is_set(): # 暫停中，不記錄。
+                continue
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None: # 由內而外走訪堆疊。
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({code.co_filename}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.stacks[";".join(reversed(stack))] += 1
+
+    def enable(self) -> None:
+        """Start or resume sampling.""" # 開始或繼續取樣。
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name=f"{DOMAIN}_sampler", daemon=True)
+            self._thread.start()
+        self._active.set()
+
+    def disable(self) -> None:
+        """Pause sampling.""" # 暫停取樣。
+        self._active.clear()
+
+    def stop(self) -> None:
+        """Stop the sampling thread.""" # 停止取樣執行緒。
+        self._active.clear()
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def dump(self, path: str) -> None:
+        """Write the samples in folded-stack format for flame graphs.""" # 以 flamegraph 可讀取的 folded 格式輸出取樣結果。
+        with open(path, "w", encoding="utf-8") as file:
+            for stack, count in self.stacks.items():
+                file.write(f"{stack} {count}\n")
+
+
+class RefreshProfiler:
+    """Profile the next N refresh cycles of all coordinators.""" # 分析所有協調器接下來 N 個刷新週期。
+
+    def __init__(self, hass: HomeAssistant) -> None:
+        self._hass = hass
+        self._remaining = 0 # 尚需分析的刷新週期數，為 0 時不執行任何分析。
+        self._mode = None # 分析模式。
+        self._profiler = None # 所有協調器共用的 cProfile 或取樣器實例。
+        self._refreshes = 0 # 正在分析中的刷新數，歸零時一個刷新週期結束。
+        self._waiting = 0 # 其中正在等待網路回應的刷新數。
+        self._enabled = False # 分析器目前是否在記錄。
+
+    @property
+    def armed(self) -> bool:
+        """Whether the next refresh should be profiled.""" # 下一次刷新是否需要分析。
+        return self._remaining > 0
+
+    def arm(self, refreshes: int, mode: str) -> None:
+        """Profile the next refresh cycles.""" # 設定分析接下來的刷新週期數。
+        if self.armed: # 前一次的分析尚未完成。
+            _LOGGER.warning("profiling is already in progress")
+            return
+        self._remaining = refreshes
+        self._mode = mode
+        if mode == PROFILE_MODE_DETERMINISTIC:
+            self._profiler = cProfile.Profile()
+        else:
+            self._profiler = StackSampler(threading.get_ident())
+        _LOGGER.info(f"profiling the next {refreshes} refresh cycles ({mode})")
+
+    def _update(self) -> None:
+        """Record only while a profiled refresh is using the event loop.""" # 只在被分析的刷新使用事件循環時記錄，等待網路時暫停，避免記錄不相關的任務。
+        enabled = self._refreshes > self._waiting
+        if enabled == self._enabled or self._profiler is None: # 狀態未變，或分析已被中止。
+            return
+        if enabled:
+            self._profiler.enable()
+        else:
+            self._profiler.disable()
+        self._enabled = enabled
+
+    def start(self) -> bool:
+        """Start profiling one refresh, returning whether it is profiled.""" # 開始分析一次刷新，返回此刷新是否被分析。
+        if not self.armed:
+            return False
+        # 同時進行的刷新共用同一個分析器，以計數決定何時啟用及停止
+        self._refreshes += 1
+        try:
+            self._update()
+        except ValueError as e: # 已有其他分析工具在執行。
+            _LOGGER.error(f"cannot start profiler: {e}")
+            self._refreshes -= 1
+            self._remaining = 0
+            self._profiler = None
+            return False
+        return True
+
+    @contextmanager
+    def waiting(self):
+        """Pause profiling while a profiled refresh waits for the network.""" # 被分析的刷新等待網路回應時暫停分析。
+        self._waiting += 1
+        self._update()
+        try:
+            yield
+        finally:
+            self._waiting -= 1
+            self._update()
+
+    async def async_stop(self) -> None:
+        """Finish one refresh and write the result after the last cycle.""" # 結束一次刷新，最後一個週期完成後輸出結果。
+        self._refreshes -= 1
+        self._update()
+        if self._refreshes or self._profiler is None: # 同一週期仍有其他刷新在進行，或分析已被中止。
+            return
+        self._remaining -= 1
+        if self._mode == PROFILE_MODE_DETERMINISTIC:
+            suffix, dump = "pstats", self._profiler.dump_stats
+        else:
+            self._profiler.stop()
+            suffix, dump = "folded", self._profiler.dump
+        if self._remaining:
+            return
+        path = self._hass.config.path(f"{DOMAIN}_profile_{strftime('%Y%m%d_%H%M%S')}.{suffix}")
+        self._profiler = None
+        await self._hass.async_add_executor_job(dump, path)
+        _LOGGER.warning(f"profile written to {path}")
@@ -3,6 +3,9 @@ from __future__ import annotations # 啟用未來版本的特性，例如在型
 import logging # 導入 logging 模組，用於記錄程式運行時的資訊、警告或錯誤。
 
 from homeassistant.components.sensor import RestoreSensor # 從 Home Assistant 的感測器組件導入 RestoreSensor，這允許感測器在 Home Assistant 重啟後恢復其上次的狀態。
+from homeassistant.core import callback # 導入 callback 裝飾器，標記在事件循環中執行的同步函式。
+from homeassistant.helpers import entity_platform # 導入實體平台模組，用於取得可等待的 async_add_entities。
+from homeassistant.helpers import entity_registry as er # 導入實體註冊表模組，用於同步實體的啟用/停用狀態。
 from homeassistant.helpers.update_coordinator import CoordinatorEntity # 從 Home Assistant 的更新協調器助手導入 CoordinatorEntity，這是一個實體基礎類別，它使用協調器來管理數據更新。
 
 from .const import ( # 從當前套件的 const.py 檔案中導入常數。
@@ -10,35 +13,140 @@ from .const import ( # 從當前套件的 const.py 檔案中導入常數。
     SITENAME_DICT, # 站點名稱字典，用於將站點 ID 對應到其名稱。
     SENSOR_INFO, # 感測器資訊字典，包含不同空氣品質類型（如 PM2.5, AQI）的配置。
     CONF_SITEID, # 配置中用於站點 ID 的鍵。
+    CONF_POLLUTANTS, # 配置中用於全域污染物列表的鍵。
+    CONF_SITE_POLLUTANTS, # 配置中用於各站點污染物列表的鍵。
+    CONF_PRIORITY_SITES, # 配置中用於優先站點列表的鍵。
+    CONF_PRIORITY_POLLUTANTS, # 配置中用於優先污染物列表的鍵。
     COORDINATOR, # 配置中用於協調器實例的鍵。
+    ADD_ENTITIES, # 保存平台 async_add_entities 方法的鍵。
+    OPTION_DESELECTED, # 實體註冊表選項中標記因取消選擇而停用的鍵。
+    ADD_CHUNK_SIZE, # 每批次註冊的實體數量。
 )
 
 _LOGGER = logging.getLogger(__name__) # 獲取一個 logger 實例，用於在此模組中記錄訊息。
 
+def site_pollutants(data, siteid): # 取得指定站點應啟用的污染物列表。
+    """Return the pollutants enabled for a site.""" # 函式的說明字串。
+    site_conf = data.get(CONF_SITE_POLLUTANTS) or {} # 各站點的個別設定，未設定時為空字典。
+    if siteid in site_conf: # 如果此站點有個別設定。
+        return site_conf[siteid] # 以站點設定優先。
+    return data.get(CONF_POLLUTANTS, list(SENSOR_INFO)) # 否則使用全域設定；升級前建立的配置條目保留所有類型為啟用。
+
+def site_selection(data): # 取得每個站點目前選擇的污染物。
+    """Return the selected pollutants of every configured site.""" # 函式的說明字串。
+    return {s_id: set(site_pollutants(data, s_id)) for s_id in data.get(CONF_SITEID, [])}
+
+def _sync_registry(hass, old_selection, entities): # 依照污染物選擇的變更同步實體註冊表中的停用狀態。
+    """Disable deselected sensors and revive reselected ones, returning the revived sensors.""" # 函式的說明字串。
+    ent_reg = er.async_get(hass) # 獲取實體註冊表。
+    revived = [] # 需要重新加入的感測器。
+    for entity in entities: # 遍歷依照新選擇建立的感測器。
+        if entity.siteid not in old_selection: # 新站點的實體首次註冊，由 entity_registry_enabled_default 決定是否啟用。
+            continue
+        selected = entity.entity_registry_enabled_default # 新的選擇。
+        if selected == (entity._type in old_selection[entity.siteid]): # 選擇未改變，保留使用者在介面中自行啟用或停用的狀態。
+            continue
+        entity_id = ent_reg.async_get_entity_id("sensor", DOMAIN, entity.unique_id) # 查詢已註冊的實體 ID。
+        if entity_id is None: # 尚未註冊，加入時會依照新的選擇註冊。
+            continue
+        reg_entry = ent_reg.async_get(entity_id) # 已註冊的實體條目。
+        if not selected and reg_entry.disabled_by is None: # 取消選擇且目前仍啟用。
+            # 在實體的註冊表選項中標記由整合停用，重新選擇時只恢復這些實體
+            ent_reg.async_update_entity_options(entity_id, DOMAIN, {OPTION_DESELECTED: True})
+            ent_reg.async_update_entity( # 由整合停用，使其不再寫入狀態機與記錄器。
+                entity_id, disabled_by=er.RegistryEntryDisabler.INTEGRATION
+            )
+        elif (
+            selected
+            and reg_entry.disabled_by is er.RegistryEntryDisabler.INTEGRATION
+            and reg_entry.options.get(DOMAIN, {}).get(OPTION_DESELECTED)
+        ): # 重新選擇且先前因取消選擇被整合停用；因 pref_disable_new_entities 或使用者停用的實體保持不變。
+            # 保留註冊表條目及使用者的名稱、區域、圖標等自訂設定，只清除停用標記並立即加入實體；
+            # Home Assistant 仍會如同在介面中啟用實體一樣，在 30 秒後重新載入配置條目
+            ent_reg.async_update_entity_options(entity_id, DOMAIN, None)
+            ent_reg.async_update_entity(entity_id, disabled_by=None)
+            revived.append(entity)
+    return revived
+
+def _build_entities(coordinator, entry, siteid): # 為指定的站點建立感測器實體列表。
+    """Create the sensors of the given sites.""" # 函式的說明字串。
+    return [ # 創建感測器實體列表。
+        aqiSensor( # 為每個站點和每個感測器類型創建一個 aqiSensor 實例。
+            coordinator=coordinator, # 傳遞數據更新協調器。
+            siteid=s_id, # 傳遞站點 ID。
+            # 傳遞站點名稱；不在內建字典中的站點（例如 API 新增的測站）改用資料中的名稱。
+            sitename=SITENAME_DICT.get(s_id) or ((coordinator.data or {}).get(s_id) or {}).get("sitename", s_id),
+            aq_type=aq_type, # 傳遞空氣品質類型（如 "pm25"）。
+            device_class=config["dc"], # 傳遞設備類別（device_class），用於 Home Assistant 的顯示和自動化。
+            unit_of_measurement=config["unit"], # 傳遞測量單位。
+            state_class=config["sc"], # 傳遞狀態類別（state_class），例如 "measurement" 或 "total"，用於歷史數據圖表。
+            display_precision=config["dp"], # 傳遞顯示精度（小數點後位數）。
+            icon=config["icon"], # 傳遞感測器圖標。
+            enabled_default=aq_type in site_pollutants(entry.data, s_id), # 未選擇的污染物以停用狀態建立。
+        ) for s_id in siteid # 遍歷所有指定的站點 ID。
+        for aq_type, config in SENSOR_INFO.items() # 遍歷 SENSOR_INFO 中定義的每個空氣品質類型及其配置。
+    ]
+
+def _prioritize(entry, entities): # 依照優先順序排列實體。
+    """Order entities so that enabled sensors of priority sites and pollutants come first.""" # 函式的說明字串。
+    priority_sites = set(entry.data.get(CONF_PRIORITY_SITES) or []) # 使用者標記的優先站點。
+    priority_pollutants = set(entry.data.get(CONF_PRIORITY_POLLUTANTS) or []) # 使用者標記的優先污染物。
+    return sorted( # 排序是穩定的，同一優先級內保持站點與類型的原始順序。
+        entities,
+        key=lambda entity: ( # 已啟用的感測器優先，其次是優先站點，再其次是優先污染物。
+            not entity.entity_registry_enabled_default,
+            entity.siteid not in priority_sites,
+            entity._type not in priority_pollutants,
+        ),
+    )
+
+async def _async_add_in_chunks(entities, async_add_entities): # 分批註冊實體，批次之間讓出事件循環。
+    """Add entities in bounded chunks, waiting for the platform to finish each chunk.""" # 函式的說明字串。
+    for start in range(0, len(entities), ADD_CHUNK_SIZE): # 依照批次大小切分實體列表。
+        # 等待平台完成整個批次，包含以停用狀態註冊而不會加入的實體，不需預測哪些實體會被加入
+        await async_add_entities(entities[start:start + ADD_CHUNK_SIZE])
+    _LOGGER.debug(f"added {len(entities)} sensors in chunks of {ADD_CHUNK_SIZE}") # 記錄註冊完成。
+
 async def async_setup_entry(hass, entry, async_add_entities): # 非同步函式，用於從配置條目設定台灣空氣品質監測感測器。
     """Set up Taiwan aqi sensors from a config entry.""" # 函式的說明字串。
     try: # 嘗試執行以下程式碼。
         siteid = entry.data.get(CONF_SITEID) # 從配置條目中獲取站點 ID。
         coordinator = hass.data[DOMAIN][entry.entry_id].get(COORDINATOR) # 從 Home Assistant 的數據中獲取此配置條目的協調器實例。
 
-        entities = [ # 創建感測器實體列表。
-            aqiSensor( # 為每個站點和每個感測器類型創建一個 aqiSensor 實例。
-                coordinator=coordinator, # 傳遞數據更新協調器。
-                siteid=s_id, # 傳遞站點 ID。
-                sitename=SITENAME_DICT[s_id], # 傳遞站點名稱。
-                aq_type=aq_type, # 傳遞空氣品質類型（如 "pm25"）。
-                device_class=config["dc"], # 傳遞設備類別（device_class），用於 Home Assistant 的顯示和自動化。
-                unit_of_measurement=config["unit"], # 傳遞測量單位。
-                state_class=config["sc"], # 傳遞狀態類別（state_class），例如 "measurement" 或 "total"，用於歷史數據圖表。
-                display_precision=config["dp"], # 傳遞顯示精度（小數點後位數）。
-                icon=config["icon"] # 傳遞感測器圖標。
-            ) for s_id in siteid # 遍歷所有配置的站點 ID。
-            for aq_type, config in SENSOR_INFO.items() # 遍歷 SENSOR_INFO 中定義的每個空氣品質類型及其配置。
-        ]
-        async_add_entities(entities) # 將創建的感測器實體添加到 Home Assistant。
+        entities = _build_entities(coordinator, entry, siteid) # 為所有配置的站點創建感測器實體，已註冊的實體保持其在註冊表中的啟用狀態。
+        # 平台的 async_add_entities 是可等待的，完成時整個批次已註冊，停用的實體也不會讓批次卡住
+        add_entities = entity_platform.async_get_current_platform().async_add_entities
+        entry.async_create_background_task( # 在背景分批將感測器實體添加到 Home Assistant，避免啟動時長時間佔用事件循環。
+            hass,
+            _async_add_in_chunks(_prioritize(entry, entities), add_entities),
+            f"{DOMAIN} add sensors",
+        )
+        hass.data[DOMAIN][entry.entry_id][ADD_ENTITIES] = add_entities # 保存平台的方法，供選項變更時新增站點使用。
     except Exception as e: # 捕獲任何可能發生的異常。
         _LOGGER.error(f"setup sensor error: {e}") # 記錄錯誤訊息。
 
+@callback
+def async_apply_selection(hass, entry, old_selection): # 將污染物選擇的變更套用到已註冊的實體。
+    """Apply pollutant selection changes to the registry, returning all sensors and the revived ones.""" # 函式的說明字串。
+    coordinator = hass.data[DOMAIN][entry.entry_id].get(COORDINATOR) # 沿用現有的協調器及其快取資料。
+    entities = _build_entities(coordinator, entry, entry.data.get(CONF_SITEID, [])) # 依照新的選項建立所有站點的實體。
+    return entities, _sync_registry(hass, old_selection, entities) # 只有選擇改變的實體才會被停用或重新啟用。
+
+@callback
+def async_update_sites(hass, entry, added_siteid, old_selection): # 在不重新載入配置條目的情況下套用選項變更。
+    """Add sensors for new sites and newly selected pollutants, and disable deselected ones.""" # 函式的說明字串。
+    entry_data = hass.data[DOMAIN][entry.entry_id] # 此配置條目的執行期資料。
+    entities, revived = async_apply_selection(hass, entry, old_selection) # 依照污染物選擇的變更停用或重新啟用現有實體。
+    # 新站點的實體，以及現有站點中重新選擇的污染物，需要透過保存的回呼加入
+    new_entities = [entity for entity in entities if entity.siteid in added_siteid or entity in revived]
+    if new_entities: # 如果有需要加入的實體。
+        entry.async_create_background_task( # 透過保存的回呼分批新增實體。
+            hass,
+            _async_add_in_chunks(_prioritize(entry, new_entities), entry_data[ADD_ENTITIES]),
+            f"{DOMAIN} add sensors",
+        )
+    _LOGGER.debug(f"added {len(new_entities)} sensors, new sites: {added_siteid}") # 記錄新增的實體數量。
+
 class aqiSensor(CoordinatorEntity, RestoreSensor): # 定義 aqiSensor 類別，繼承自 CoordinatorEntity 和 RestoreSensor。
     """Representation of a Taiwan aqi sensor.""" # 類別的說明字串。
 
@@ -53,6 +161,7 @@ class aqiSensor(CoordinatorEntity, RestoreSensor): # 定義 aqiSensor 類別，
         state_class=None, # 狀態類別，可選。
         display_precision=None, # 顯示精度，可選。
         icon=None, # 圖標，可選。
+        enabled_default=True, # 首次註冊時是否啟用，可選。
     ):
         """Initialize the AQI sensor.""" # 初始化方法的說明字串。
         super().__init__(coordinator) # 調用父類 CoordinatorEntity 的初始化方法，傳遞協調器。
@@ -64,11 +173,21 @@ class aqiSensor(CoordinatorEntity, RestoreSensor): # 定義 aqiSensor 類別，
         self._state_class = state_class # 設置狀態類別（內部使用）。
         self._display_precision = display_precision # 設置顯示精度（內部使用）。
         self._icon = icon # 設置圖標（內部使用）。
+        self._attr_entity_registry_enabled_default = enabled_default # 設置首次註冊時的啟用狀態。
         self._last_value = None # 初始化 _last_value 為 None，用於存儲上次的值。
-        _LOGGER.debug(f"Initialized TaiwanaqiEntity for siteid: {self.siteid}, type: {self._type}") # 記錄調試訊息，表示實體已初始化。
+        _type = aq_type.replace("_", " ") if aq_type else "unknown" # 將空氣品質類型中的下劃線替換為空格，如果沒有則為 "unknown"。
+        self._name = f"{sitename} {_type}" # 名稱只需組合一次（站點名稱 + 空氣品質類型）。
+        sanitized_name = aq_type.replace(" ", "_") if aq_type else "unknown" # 將空氣品質類型中的空格替換為下劃線，如果沒有則為 "unknown"。
+        self._unique_id = f"{DOMAIN}_{siteid}_{sanitized_name}" # 唯一 ID 只需組合一次。
+        self._native_value = None # 每次刷新計算一次的原生值，渲染狀態時直接返回。
+        self._available = False # 每次刷新計算一次的可用狀態。
+        self._attributes = None # 每次刷新計算一次的額外屬性。
+        self._refresh_state() # 依照協調器目前的資料計算初始狀態。
+        _LOGGER.debug("Initialized TaiwanaqiEntity for siteid: %s, type: %s", siteid, aq_type) # 記錄調試訊息，表示實體已初始化。
 
     async def async_added_to_hass(self): # 當實體被添加到 Home Assistant 時調用的非同步方法。
         """Get the old value""" # 函式的說明字串，用於獲取舊值。
+        self._refresh_state() # 分批註冊期間協調器可能已刷新，重新計算狀態。
         await super().async_added_to_hass() # 調用父類的方法。
 
         if (last_sensor_data := await self.async_get_last_sensor_data()) \
@@ -81,6 +200,29 @@ class aqiSensor(CoordinatorEntity, RestoreSensor): # 定義 aqiSensor 類別，
     def _data(self): # 獲取協調器數據的屬性。
         return self.coordinator.data # 返回協調器中存儲的數據。
 
+    @callback
+    def _handle_coordinator_update(self): # 協調器刷新後調用，每次刷新只計算一次狀態。
+        """Compute the state once per refresh, then write it.""" # 函式的說明字串。
+        self._refresh_state() # 計算並快取狀態。
+        super()._handle_coordinator_update() # 調用父類的方法寫入狀態。
+
+    def _refresh_state(self): # 依照協調器資料計算並快取原生值、可用狀態及額外屬性。
+        """Cache the value, availability and attributes of the current data.""" # 函式的說明字串。
+        data = self._data # 只讀取一次協調器數據。
+        record = data.get(self.siteid) if data else None # 此站點的記錄，沒有數據或站點時為 None。
+        if self._is_valid_data() and self.coordinator.last_update_success: # 如果數據有效且上次更新成功。
+            self._last_value = record.get(self._type) # 從數據中獲取當前站點和類型的空氣品質值，並更新 _last_value。
+            self._native_value = self._last_value # 快取獲取到的值。
+        else: # 如果數據無效或更新失敗。
+            self._native_value = "unknown" if self._device_class is None else 0 # 如果設備類別為 None 則為 "unknown"，否則為 0。
+        self._available = record is not None # 如果站點 ID 在數據中則為 True，表示可用。
+        self._attributes = { # 快取包含額外屬性的字典。
+            "sitename": self._sitename, # 站點名稱。
+            "siteid": self.siteid, # 站點 ID。
+            "longitude": record.get("longitude", "unknown") if record else "unknown", # 經度，如果沒有則為 "unknown"。
+            "latitude": record.get("latitude", "unknown") if record else "unknown", # 緯度，如果沒有則為 "unknown"。
+        }
+
     @property # 裝飾器，將方法轉換為屬性。
     def device_info(self): # 返回設備資訊的屬性，用於 Home Assistant 中顯示設備。
         return { # 返回一個字典，包含設備的識別資訊。
@@ -92,11 +234,7 @@ class aqiSensor(CoordinatorEntity, RestoreSensor): # 定義 aqiSensor 類別，
 
     @property # 裝飾器，將方法轉換為屬性。
     def native_value(self): # 返回感測器當前原生值的屬性。
-        if self._is_valid_data() and self.coordinator.last_update_success: # 如果數據有效且上次更新成功。
-            self._last_value = self._data[self.siteid].get(self._type) # 從數據中獲取當前站點和類型的空氣品質值，並更新 _last_value。
-            return self._last_value # 返回獲取到的值。
-        else: # 如果數據無效或更新失敗。
-            return "unknown" if self._device_class is None else 0 # 如果設備類別為 None 則返回 "unknown"，否則返回 0。
+        return self._native_value # 返回刷新時已計算的值，渲染時不做任何運算。
 
     @property # 裝飾器，將方法轉換為屬性。
     def device_class(self): # 返回設備類別的屬性。
@@ -116,28 +254,15 @@ class aqiSensor(CoordinatorEntity, RestoreSensor): # 定義 aqiSensor 類別，
 
     @property # 裝飾器，將方法轉換為屬性。
     def extra_state_attributes(self): # 返回額外狀態屬性的屬性。
-        if self._data and self.siteid in self._data: # 如果有數據且站點 ID 在數據中。
-            lon = self._data[self.siteid].get("longitude", "unknown") # 獲取經度，如果沒有則為 "unknown"。
-            lat = self._data[self.siteid].get("latitude", "unknown") # 獲取緯度，如果沒有則為 "unknown"。
-        else: # 如果沒有數據或站點 ID 不在數據中。
-            lon = "unknown" # 經度設為 "unknown"。
-            lat = "unknown" # 緯度設為 "unknown"。
-
-        return { # 返回包含額外屬性的字典。
-            "sitename": self._sitename, # 站點名稱。
-            "siteid": self.siteid, # 站點 ID。
-            "longitude": lon, # 經度。
-            "latitude": lat, # 緯度。
-        }
+        return self._attributes # 返回刷新時已建立的字典。
 
     @property # 裝飾器，將方法轉換為屬性。
     def available(self): # 返回感測器是否可用的屬性。
-        return self.siteid in self._data # 如果站點 ID 在數據中則返回 True，表示可用。
+        return self._available # 返回刷新時已計算的可用狀態。
 
     @property # 裝飾器，將方法轉換為屬性。
     def name(self): # 返回感測器名稱的屬性。
-        _type = self._type.replace("_", " ") if self._type else "unknown" # 將空氣品質類型中的下劃線替換為空格，如果沒有則為 "unknown"。
-        return f"{self._sitename} {_type}" # 返回格式化的感測器名稱（站點名稱 + 空氣品質類型）。
+        return self._name # 返回初始化時組合的感測器名稱。
 
     @property # 裝飾器，將方法轉換為屬性。
     def has_entity_name(self): # 返回是否使用實體名稱的屬性。
@@ -145,29 +270,20 @@ class aqiSensor(CoordinatorEntity, RestoreSensor): # 定義 aqiSensor 類別，
 
     @property # 裝飾器，將方法轉換為屬性。
     def unique_id(self): # 返回感測器唯一 ID 的屬性。
-        sanitized_name = self._type.replace(" ", "_") if self._type else "unknown" # 將空氣品質類型中的空格替換為下劃線，如果沒有則為 "unknown"。
-        return f"{DOMAIN}_{self.siteid}_{sanitized_name}" # 返回格式化的唯一 ID。
+        return self._unique_id # 返回初始化時組合的唯一 ID。
 
     @property # 裝飾器，將方法轉換為屬性。
     def icon(self): # 返回感測器圖標的屬性。
         return self._icon # 返回在初始化時設置的圖標。
 
-    def _is_valid_data(self) -> bool: # 內部方法，用於驗證數據的完整性。
+    def _is_valid_data(self) -> bool: # 內部方法，用於驗證數據的完整性，每次刷新只調用一次。
         """Validate the integrity of the data.""" # 函式的說明字串。
-        if not self._data: # 如果沒有數據。
-            _LOGGER.error("No data available") # 記錄錯誤訊息。
-            return False # 返回 False。
-
-        if self.siteid not in self._data: # 如果站點 ID 不在數據中。
-            _LOGGER.warning(f"The site ID '{self.siteid}' is not in the data: {self._data.keys()}") # 記錄警告訊息。
+        # 沒有數據或缺少站點時由協調器每次刷新記錄一次，這裡不再逐一記錄。
+        if not self._data or self.siteid not in self._data: # 如果沒有數據或站點 ID 不在數據中。
             return False # 返回 False。
 
-        if (value := self._data[self.siteid].get(self._type)) in [None, ""]: # 如果特定站點和類型的數據值為 None 或空字符串。
-            if value is None: # 如果值為 None。
-                _LOGGER.debug(f"The value for '{self._type}' in siteID '{self.siteid}' is missing or None.") # 記錄調試訊息。
-            elif value == "": # 如果值為空字符串。
-                _LOGGER.debug(f"The value for '{self._type}' in siteID '{self.siteid}' is empy") # 記錄調試訊息。
+        if (value := self._data[self.siteid].get(self._type)) in (None, ""): # 如果特定站點和類型的數據值為 None 或空字符串。
+            _LOGGER.debug("The value for '%s' in siteID '%s' is missing or empty", self._type, self.siteid) # 延遲格式化的調試訊息。
             return False # 返回 False。
 
-        _LOGGER.debug(f"Valid data found for site '{self.siteid}' and type '{self._type}': {value}") # 記錄調試訊息，表示找到有效數據。
-        return True # 返回 True，表示數據有效。 [1]
+        return True # 返回 True，表示數據有效。
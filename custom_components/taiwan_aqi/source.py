@@ -0,0 +1,168 @@
+"""Hedged access to equivalent Taiwan AQI endpoints.""" # 以對沖請求存取多個等效的台灣空氣品質 API 端點。
+
+from __future__ import annotations # 啟用延遲評估的型別提示。
+
+import asyncio # 導入 asyncio 模組，用於同時發出並競爭多個請求。
+import logging # 導入 logging 模組，用於記錄日誌資訊。
+from collections import deque # 導入 deque，用於保存固定數量的最近延遲樣本。
+from contextlib import nullcontext # 導入 nullcontext，作為等待網路時的預設上下文。
+from time import monotonic # 導入 monotonic，用於量測請求延遲。
+
+import aiohttp # 導入 aiohttp，Home Assistant 內建的非同步 HTTP 客戶端。
+
+from homeassistant.core import HomeAssistant # 導入 HomeAssistant 核心物件。
+from homeassistant.helpers.aiohttp_client import async_get_clientsession # 導入共用的 aiohttp session。
+from homeassistant.util.json import json_loads # 導入 Home Assistant 的 JSON 解碼函式。
+
+from .const import ( # 從當前包導入常量。
+    HA_USER_AGENT, # 請求時使用的 User-Agent。
+    REQUEST_TIMEOUT, # 單一端點請求的逾時秒數。
+    HEDGE_PERCENTILE, # 對沖等待時間所使用的延遲百分位數。
+    HEDGE_SAMPLES, # 保留的延遲樣本數。
+    HEDGE_MIN_SAMPLES, # 開始使用百分位數前所需的最少樣本數。
+    HEDGE_DEFAULT_DELAY, # 樣本不足時的預設等待秒數。
+    HEDGE_MIN_DELAY, # 等待時間的下限秒數。
+    LATENCY_EWMA_ALPHA, # 端點延遲的指數移動平均權重。
+)
+
+_LOGGER = logging.getLogger(__name__) # 獲取此模組的日誌記錄器。
+
+
+class EndpointHealth:
+    """Latency and failure tracking of one endpoint.""" # 追蹤單一端點的延遲與失敗次數。
+
+    def __init__(self, url: str) -> None:
+        self.url = url # 端點的 URL。
+        self.latency = None # 延遲的指數移動平均（秒），尚未請求過時為 None。
+        self.failures = 0 # 連續失敗次數。
+        self.outpaced = False # 上次請求是否被對沖請求搶先，成功回應後清除。
+
+    def record_latency(self, elapsed: float) -> None:
+        """Fold a latency sample into the moving average.""" # 將延遲樣本併入移動平均。
+        if self.latency is None:
+            self.latency = elapsed
+        else:
+            self.latency += LATENCY_EWMA_ALPHA * (elapsed - self.latency)
+
+    def record_success(self, elapsed: float) -> None:
+        """Record a valid response.""" # 記錄一次有效的回應。
+        self.record_latency(elapsed)
+        self.failures = 0
+        self.outpaced = False
+
+    def record_failure(self) -> None:
+        """Record a failed or invalid response.""" # 記錄一次失敗或無效的回應。
+        self.failures += 1
+
+
+class AQISource:
+    """Fetch the national payload from the healthiest of several endpoints.""" # 從多個端點中最健康的一個取得全國資料。
+
+    def __init__(self, hass: HomeAssistant, endpoints: list[str]) -> None:
+        self._session = async_get_clientsession(hass) # Home Assistant 共用的 HTTP session。
+        self._endpoints = [] # 依照設定順序排列的端點健康狀態。
+        self._latencies = deque(maxlen=HEDGE_SAMPLES) # 最近成功請求的延遲樣本。
+        self.set_endpoints(endpoints)
+
+    def set_endpoints(self, endpoints: list[str]) -> None:
+        """Replace the endpoint list, keeping the health of known endpoints.""" # 更新端點列表，保留已知端點的健康狀態。
+        known = {endpoint.url: endpoint for endpoint in self._endpoints}
+        self._endpoints = [known.get(url) or EndpointHealth(url) for url in endpoints]
+
+    @property
+    def hedge_delay(self) -> float:
+        """Seconds to wait before sending a hedged request.""" # 發出對沖請求前的等待秒數。
+        if len(self._latencies) < HEDGE_MIN_SAMPLES: # 樣本不足時使用預設值。
+            return HEDGE_DEFAULT_DELAY
+        ordered = sorted(self._latencies)
+        return max(HEDGE_MIN_DELAY, ordered[int(HEDGE_PERCENTILE * (len(ordered) - 1))])
+
+    def ranked(self) -> list[EndpointHealth]:
+        """Endpoints in the order they will be tried.""" # 端點的嘗試順序。
+        # 連續失敗次數少的優先，其次是上次未被對沖請求搶先的端點，再依延遲的移動平均由快到慢，
+        # 尚未量測的端點視為最快，讓每個端點至少被嘗試一次；同級時保持設定順序
+        return sorted(
+            self._endpoints,
+            key=lambda endpoint: (endpoint.failures, endpoint.outpaced, endpoint.latency or 0.0),
+        )
+
+    async def _async_fetch_one(self, endpoint: EndpointHealth, params: dict) -> tuple[bytes, float]:
+        """Fetch the raw payload of one endpoint and its latency.""" # 從單一端點取得原始資料及其延遲。
+        start = monotonic()
+        try:
+            async with self._session.get(
+                endpoint.url,
+                params=params,
+                headers={"User-Agent": HA_USER_AGENT},
+                timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT),
+            ) as response:
+                response.raise_for_status()
+                body = await response.read()
+        except asyncio.CancelledError:
+            # 被較快的端點取代時降級此端點，已經過的時間仍是其延遲的下限
+            endpoint.record_latency(monotonic() - start)
+            endpoint.outpaced = True
+            raise
+        except aiohttp.ClientResponseError as err:
+            # 錯誤訊息包含帶有 api_key 查詢字串的完整 URL，改以不含查詢字串的端點 URL 重新拋出，避免金鑰寫入日誌
+            endpoint.record_failure()
+            raise aiohttp.ClientError(f"HTTP {err.status} from {endpoint.url}") from None
+        except Exception:
+            endpoint.record_failure()
+            raise
+        return body, monotonic() - start
+
+    def _accept(self, endpoint: EndpointHealth, body: bytes, elapsed: float) -> dict:
+        """Decode and validate a payload, recording the health of its endpoint.""" # 解碼並驗證資料，並記錄其端點的健康狀態。
+        try:
+            payload = json_loads(body)
+            if not isinstance(payload, dict) or not payload.get("records"): # 沒有任何記錄的回應視為無效。
+                raise ValueError(f"invalid payload from {endpoint.url}")
+        except ValueError:
+            endpoint.record_failure()
+            raise
+        endpoint.record_success(elapsed)
+        self._latencies.append(elapsed)
+        return payload
+
+    async def async_fetch(self, api_key: str, waiting=nullcontext) -> dict:
+        """Return the first valid payload of the ranked endpoints.""" # 返回依序排列之端點中最先取得的有效資料。
+        params = {"language": "zh", "api_key": api_key}
+        candidates = iter(self.ranked())
+        launched = {} # 進行中的請求任務及其端點。
+        last_error = None
+
+        def launch() -> bool:
+            """Send a request to the next candidate.""" # 向下一個候選端點發出請求。
+            if (endpoint := next(candidates, None)) is None:
+                return False
+            launched[asyncio.create_task(self._async_fetch_one(endpoint, params))] = endpoint
+            return True
+
+        launch()
+        try:
+            while launched:
+                with waiting(): # 等待網路回應的期間，分析器暫停記錄。
+                    done, _ = await asyncio.wait(
+                        launched, timeout=self.hedge_delay, return_when=asyncio.FIRST_COMPLETED
+                    )
+                if not done:
+                    # 超過對沖等待時間仍未回應，向下一個端點發出對沖請求
+                    if launch():
+                        _LOGGER.debug(f"hedging request after {self.hedge_delay:.2f}s")
+                    continue
+                for task in done:
+                    endpoint = launched.pop(task)
+                    try:
+                        # 解碼及驗證在等待之外進行，分析時會被記錄
+                        return self._accept(endpoint, *task.result())
+                    except Exception as err:
+                        last_error = err
+                        _LOGGER.debug(f"endpoint failed: {last_error}")
+                        # 請求失敗時立即改用下一個端點
+                        launch()
+        finally:
+            for task in launched:
+                if not task.cancel() and not task.cancelled(): # 已完成但未處理的請求，取出其異常避免未處理的警告。
+                    task.exception()
+        raise last_error or ValueError("no endpoint configured")
@@ -0,0 +1,168 @@
+"""Websocket API for Taiwan AQI.""" # 台灣空氣品質監測的 websocket API，以欄式格式提供所有站點的資料。
+
+from __future__ import annotations # 啟用延遲評估的型別提示。
+
+import logging # 導入 logging 模組，用於記錄日誌資訊。
+
+import voluptuous as vol # 導入 voluptuous，用於驗證 websocket 指令的參數。
+
+from homeassistant.components import websocket_api # 從 Home Assistant 導入 websocket_api 組件。
+from homeassistant.core import HomeAssistant, callback # 導入 HomeAssistant 核心物件和 callback 裝飾器。
+from homeassistant.helpers.dispatcher import async_dispatcher_connect # 導入 dispatcher 連接函式，用於接收配置條目卸載的信號。
+
+from .const import ( # 從當前包導入常量。
+    DOMAIN, # 整合的領域名稱。
+    COORDINATOR, # 協調器物件的鍵。
+    SNAPSHOT, # 欄式快照快取的鍵。
+    SIGNAL_ENTRY_UNLOADED, # 配置條目卸載的信號。
+    SENSOR_INFO, # 感測器資訊字典，其鍵即為污染物欄位。
+)
+
+_LOGGER = logging.getLogger(__name__) # 獲取此模組的日誌記錄器。
+
+# 每個站點輸出一個值的欄位，publishtime 另外作為每個站點的欄位及差異的分組鍵輸出。
+VALUE_KEYS = [key for key in SENSOR_INFO if key != "publishtime"]
+
+
+def _columns(data: dict, siteids: list) -> dict:
+    """Build a columnar payload for the given sites.""" # 為指定站點建立欄式資料。
+    records = [data[s_id] for s_id in siteids] # 依序取得每個站點的記錄。
+    return {
+        "siteid": list(siteids), # 站點 ID 欄。
+        "sitename": [r.get("sitename") for r in records], # 站點名稱欄。
+        "county": [r.get("county") for r in records], # 縣市欄。
+        "longitude": [r.get("longitude") for r in records], # 經度欄。
+        "latitude": [r.get("latitude") for r in records], # 緯度欄。
+        "publishtime": [r.get("publishtime") for r in records], # 發布時間欄，讓訂閱者知道快照中每一列來自哪一次發布。
+        "values": {key: [r.get(key) for r in records] for key in VALUE_KEYS}, # 每種污染物一個值陣列。
+    }
+
+
+class ColumnarSnapshot:
+    """Columnar view of the coordinator data, rebuilt once per refresh.""" # 協調器資料的欄式快照，每次刷新只重建一次。
+
+    def __init__(self) -> None:
+        self._source = None # 目前快照所對應的協調器資料物件。
+        self._publishtime = {} # 每個站點最近一次的發布時間。
+        self.columns = None # 所有站點的欄式資料。
+        self.delta = {} # 與前一次資料相比的差異，以發布時間分組。
+        self.removed = [] # 與前一次資料相比不再出現的站點 ID。
+
+    def update(self, data: dict) -> None:
+        """Rebuild the snapshot if the coordinator data changed.""" # 如果協調器資料已更新則重建快照。
+        if data is self._source: # 同一份資料已處理過，所有訂閱者共用結果。
+            return
+        old_publishtime = self._publishtime
+        self._source = data
+        data = data or {} # 首次刷新前協調器資料可能為 None。
+        self._publishtime = {s_id: record.get("publishtime") for s_id, record in data.items()}
+        self.columns = _columns(data, list(data))
+
+        # 只有發布時間改變的站點才需要傳送給訂閱者
+        changed = {}
+        for s_id, publishtime in self._publishtime.items():
+            if old_publishtime.get(s_id) != publishtime:
+                changed.setdefault(publishtime, []).append(s_id)
+        self.delta = {
+            publishtime: _columns(data, siteids) for publishtime, siteids in changed.items()
+        }
+        # 從資料中消失的站點也要通知訂閱者，否則其欄式資料會保留過期的列
+        self.removed = [s_id for s_id in old_publishtime if s_id not in self._publishtime]
+
+
+@callback
+def async_register_websocket_commands(hass: HomeAssistant) -> None:
+    """Register the websocket commands.""" # 註冊 websocket 指令。
+    websocket_api.async_register_command(hass, websocket_snapshot)
+    websocket_api.async_register_command(hass, websocket_subscribe)
+
+
+def _get_entry_data(hass: HomeAssistant, entry_id: str | None) -> tuple[str, dict] | None:
+    """Return the id and runtime data of a config entry, or of the first one.""" # 取得指定配置條目的 ID 及執行期資料，未指定時取第一個。
+    domain_data = hass.data.get(DOMAIN, {})
+    if entry_id is not None:
+        return (entry_id, domain_data[entry_id]) if entry_id in domain_data else None
+    return next(iter(domain_data.items()), None)
+
+
+def _get_snapshot(entry_data: dict) -> ColumnarSnapshot:
+    """Return the snapshot of an entry, updated to the latest data.""" # 取得配置條目的快照，並更新至最新資料。
+    snapshot = entry_data.setdefault(SNAPSHOT, ColumnarSnapshot())
+    snapshot.update(entry_data[COORDINATOR].data)
+    return snapshot
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): f"{DOMAIN}/snapshot",
+        vol.Optional("entry_id"): str,
+    }
+)
+@callback
+def websocket_snapshot(
+    hass: HomeAssistant, connection: websocket_api.ActiveConnection, msg: dict
+) -> None:
+    """Return the current data of all stations in columnar form.""" # 以欄式格式返回所有站點的目前資料。
+    if (found := _get_entry_data(hass, msg.get("entry_id"))) is None:
+        connection.send_error(msg["id"], websocket_api.ERR_NOT_FOUND, "Config entry not found")
+        return
+    connection.send_result(msg["id"], _get_snapshot(found[1]).columns)
+
+
+@websocket_api.websocket_command(
+    {
+        vol.Required("type"): f"{DOMAIN}/subscribe",
+        vol.Optional("entry_id"): str,
+    }
+)
+@callback
+def websocket_subscribe(
+    hass: HomeAssistant, connection: websocket_api.ActiveConnection, msg: dict
+) -> None:
+    """Send a snapshot, then deltas keyed by publishtime on each refresh.""" # 先傳送完整快照，之後每次刷新只傳送以發布時間分組的差異及移除的站點。
+    if (found := _get_entry_data(hass, msg.get("entry_id"))) is None:
+        connection.send_error(msg["id"], websocket_api.ERR_NOT_FOUND, "Config entry not found")
+        return
+    entry_id, entry_data = found
+    coordinator = entry_data[COORDINATOR]
+    last_source = coordinator.data
+
+    @callback
+    def forward_delta() -> None:
+        """Forward the changes of a refresh to the subscriber.""" # 將刷新後的變更轉發給訂閱者。
+        nonlocal last_source
+        if coordinator.data is last_source: # 更新失敗或資料未變更時不傳送。
+            return
+        last_source = coordinator.data
+        snapshot = _get_snapshot(entry_data)
+        if snapshot.delta or snapshot.removed:
+            connection.send_message(
+                websocket_api.event_message(
+                    msg["id"], {"type": "delta", "deltas": snapshot.delta, "removed": snapshot.removed}
+                )
+            )
+
+    @callback
+    def unsubscribe() -> None:
+        """Stop forwarding refreshes.""" # 停止轉發刷新。
+        remove_listener()
+        remove_unload_listener()
+
+    @callback
+    def end_subscription() -> None:
+        """End the subscription when the config entry unloads.""" # 配置條目卸載時結束訂閱，讓訂閱者知道需要重新訂閱。
+        unsubscribe()
+        connection.subscriptions.pop(msg["id"], None)
+        connection.send_message(websocket_api.event_message(msg["id"], {"type": "unloaded"}))
+
+    remove_listener = coordinator.async_add_listener(forward_delta)
+    remove_unload_listener = async_dispatcher_connect(
+        hass, SIGNAL_ENTRY_UNLOADED.format(entry_id), end_subscription
+    )
+    connection.subscriptions[msg["id"]] = unsubscribe
+    connection.send_result(msg["id"])
+    connection.send_message(
+        websocket_api.event_message(
+            msg["id"], {"type": "snapshot", **_get_snapshot(entry_data).columns}
+        )
+    )
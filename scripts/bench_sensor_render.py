@@ -0,0 +1,148 @@
+"""Benchmark of aqiSensor state rendering.""" # 量測 aqiSensor 渲染狀態的成本，確認其與站點數量無關且不配置記憶體。
+
+from __future__ import annotations # 啟用延遲評估的型別提示。
+
+import argparse # 導入 argparse，用於解析命令列參數。
+import asyncio # 導入 asyncio，用於在事件循環中寫入狀態。
+import logging # 導入 logging，提供給實體元件使用。
+import os # 導入 os，用於取得專案根目錄。
+import sys # 導入 sys，用於設定導入路徑。
+import tempfile # 導入 tempfile，用於建立臨時的設定目錄。
+import time # 導入 time，用於量測時間。
+import tracemalloc # 導入 tracemalloc，用於量測記憶體配置。
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__)))) # 讓 custom_components 可以被導入。
+
+_LOGGER = logging.getLogger(__name__) # 獲取此模組的日誌記錄器。
+
+from homeassistant.core import HomeAssistant # noqa: E402 導入 HomeAssistant，刷新時實際寫入狀態機。
+from homeassistant.helpers import area_registry as ar, device_registry as dr, entity_registry as er # noqa: E402 導入註冊表，實體元件加入實體時需要。
+from homeassistant.helpers import entity as entity_helper, restore_state, translation # noqa: E402 導入實體來源、恢復狀態及翻譯的初始化函式。
+from homeassistant.helpers.entity_component import EntityComponent # noqa: E402 導入實體元件，以與整合相同的方式加入實體。
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator # noqa: E402 導入協調器，刷新時通知所有實體。
+
+from custom_components.taiwan_aqi.const import DEFAULT_POLLUTANTS, SENSOR_INFO # noqa: E402 導入感測器資訊字典。
+from custom_components.taiwan_aqi.sensor import aqiSensor # noqa: E402 導入要量測的感測器類別。
+
+
+def make_data(stations: int, value: float) -> dict:
+    """Build coordinator data with the given number of stations.""" # 建立指定站點數量的協調器資料。
+    return {
+        str(i): {
+            "siteid": str(i), "longitude": "121.0", "latitude": "25.0", "publishtime": "2024/01/01 00:00:00",
+            **{key: f"{value + i % 7:.1f}" for key in SENSOR_INFO if key != "publishtime"},
+        }
+        for i in range(stations)
+    }
+
+
+def make_entities(coordinator, stations: int, types: list) -> list:
+    """Create the sensors of every station and type.""" # 為每個站點及類型建立感測器。
+    entities = []
+    for i in range(stations):
+        for aq_type in types:
+            config = SENSOR_INFO[aq_type]
+            entity = aqiSensor(
+                coordinator=coordinator,
+                siteid=str(i),
+                sitename=f"bench{i}",
+                aq_type=aq_type,
+                device_class=config["dc"],
+                unit_of_measurement=config["unit"],
+                state_class=config["sc"],
+                display_precision=config["dp"],
+                icon=config["icon"],
+            )
+            entities.append(entity)
+    return entities
+
+
+def render(entities: list) -> None:
+    """Read the properties used when writing a state.""" # 讀取寫入狀態時會用到的屬性。
+    for entity in entities:
+        entity.native_value
+        entity.available
+        entity.extra_state_attributes
+
+
+async def bench(stations: int, types: list, renders: int, refreshes: int) -> dict:
+    """Measure renders and refreshes of all sensors of the given number of stations.""" # 量測指定站點數量所有感測器的渲染及刷新成本。
+    with tempfile.TemporaryDirectory() as config_dir:
+        hass = HomeAssistant(config_dir)
+        translation.async_setup(hass)
+        entity_helper.async_setup(hass)
+        await ar.async_load(hass)
+        await dr.async_load(hass)
+        await er.async_load(hass)
+        await restore_state.async_load(hass)
+        await hass.async_start()
+        coordinator = DataUpdateCoordinator(hass, _LOGGER, name="bench") # 不定期更新，只在量測時設定資料。
+        coordinator.data = make_data(stations, 10.0)
+        entities = make_entities(coordinator, stations, types)
+        # 以實體元件加入，與整合相同會註冊實體並寫入初始狀態
+        await EntityComponent(_LOGGER, "sensor", hass).async_add_entities(entities)
+        render(entities) # 預熱。
+
+        # 重複渲染同一個實體，只量測渲染路徑本身，不受快取未命中影響
+        single = entities[-1:]
+        start = time.perf_counter_ns()
+        for _ in range(renders):
+            render(single)
+        single_ns = (time.perf_counter_ns() - start) / renders
+
+        passes = max(1, renders // len(entities)) # 讓每個站點數量的渲染總次數相近。
+        start = time.perf_counter_ns()
+        for _ in range(passes):
+            render(entities)
+        render_ns = (time.perf_counter_ns() - start) / (passes * len(entities))
+
+        tracemalloc.start()
+        before = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        for _ in range(passes):
+            render(entities)
+        allocated = tracemalloc.get_traced_memory()[1] - before
+        tracemalloc.stop()
+
+        # 每次刷新都是新的協調器資料及新的數值，與實際刷新相同，協調器通知每個實體的 _handle_coordinator_update 寫入新的狀態
+        refresh_ns = []
+        for k in range(refreshes):
+            data = make_data(stations, 20.0 + k)
+            start = time.perf_counter_ns()
+            coordinator.async_set_updated_data(data)
+            refresh_ns.append(time.perf_counter_ns() - start)
+        refresh_ns.sort()
+        await hass.async_stop()
+    return {
+        "entities": len(entities),
+        "single_ns": single_ns,
+        "render_ns": render_ns,
+        "allocated": allocated,
+        "refresh_ms": refresh_ns[len(refresh_ns) // 2] / 1e6,
+        "refresh_entity_us": refresh_ns[len(refresh_ns) // 2] / len(entities) / 1e3,
+    }
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__)
+    p.add_argument("--renders", type=int, default=500_000, help="approximate property renders per station count")
+    p.add_argument("--refreshes", type=int, default=5, help="coordinator refreshes to time")
+    p.add_argument("--stations", type=int, nargs="*", default=[85, 850, 8500])
+    p.add_argument("--all-pollutants", action="store_true", help="create every sensor type instead of the defaults")
+    args = p.parse_args()
+    types = list(SENSOR_INFO) if args.all_pollutants else DEFAULT_POLLUTANTS
+    print(
+        f"{'stations':>9} {'entities':>9} {'ns/render 1':>12} {'ns/render all':>14} {'bytes allocated':>16} "
+        f"{'ms/refresh':>11} {'us/entity':>10}"
+    )
+    for stations in args.stations:
+        result = asyncio.run(bench(stations, types, args.renders, args.refreshes))
+        print(
+            f"{stations:>9} {result['entities']:>9} {result['single_ns']:>12.1f} {result['render_ns']:>14.1f} "
+            f"{result['allocated']:>16} "
+            f"{result['refresh_ms']:>11.1f} {result['refresh_entity_us']:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
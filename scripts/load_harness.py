@@ -0,0 +1,285 @@
+"""Load simulation of the Taiwan AQI integration against the replay server.""" # 以本機重播伺服器對台灣空氣品質整合進行負載模擬，用於主機容量規劃。
+
+from __future__ import annotations # 啟用延遲評估的型別提示。
+
+import argparse # 導入 argparse，用於解析命令列參數。
+import asyncio # 導入 asyncio，用於執行 Home Assistant 及事件循環延遲監測。
+import inspect # 導入 inspect，用於相容不同版本的 ConfigEntry 建構參數。
+import json # 導入 json，用於輸出報告。
+import os # 導入 os，用於建立臨時的設定目錄。
+import resource # 導入 resource，用於取得行程的最大常駐記憶體。
+import socket # 導入 socket，用於取得可用的連接埠。
+import sqlite3 # 導入 sqlite3，用於統計記錄器寫入的狀態數。
+import statistics # 導入 statistics，用於計算延遲的統計值。
+import subprocess # 導入 subprocess，用於啟動重播伺服器。
+import sys # 導入 sys，用於取得目前的 Python 直譯器。
+import tempfile # 導入 tempfile，用於建立臨時目錄。
+import time # 導入 time，用於量測時間。
+import tracemalloc # 導入 tracemalloc，用於追蹤 Python 的記憶體配置。
+from types import MappingProxyType # 導入 MappingProxyType，用於建立唯讀的空映射。
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) # 專案根目錄。
+sys.path.insert(0, ROOT) # 讓 custom_components 可以被導入。
+
+from homeassistant import bootstrap # noqa: E402 導入 Home Assistant 的啟動模組。
+from homeassistant.config_entries import ConfigEntry # noqa: E402 導入 ConfigEntry 類。
+from homeassistant.const import EVENT_STATE_CHANGED # noqa: E402 導入狀態變更事件名稱。
+from homeassistant.runner import RuntimeConfig # noqa: E402 導入執行期設定類。
+
+from custom_components.taiwan_aqi.const import ( # noqa: E402 從整合導入常量。
+    DOMAIN,
+    CONF_API_KEY,
+    CONF_SITEID,
+    CONF_POLLUTANTS,
+    CONF_ENDPOINTS,
+    COORDINATOR,
+    DEFAULT_POLLUTANTS,
+    SENSOR_INFO,
+    SITEID_DICT,
+)
+from replay_server import clone_siteid # noqa: E402 導入複製站點的 ID 規則，讓配置條目涵蓋放大後的所有站點。
+
+CONFIGURATION_YAML = """
+homeassistant:
+  name: taiwan_aqi load harness
+  latitude: 25.0
+  longitude: 121.5
+  elevation: 0
+  unit_system: metric
+  time_zone: Asia/Taipei
+http:
+  server_port: {http_port}
+logger:
+  default: warning
+{recorder}
+""" # 臨時設定目錄的 configuration.yaml。
+
+
+def free_port() -> int:
+    """Return an unused TCP port.""" # 返回一個未使用的 TCP 連接埠。
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values: list[float], pct: float) -> float:
+    """Return the pct percentile of values.""" # 返回數值的百分位數。
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[int(pct * (len(ordered) - 1))]
+
+
+def make_entry(index: int, data: dict) -> ConfigEntry:
+    """Create a config entry across Home Assistant versions.""" # 建立配置條目，相容不同版本的建構參數。
+    params = inspect.signature(ConfigEntry).parameters
+    kwargs = {
+        "version": 2,
+        "minor_version": 1,
+        "domain": DOMAIN,
+        "title": f"TWAQ Monitor {index}",
+        "data": data,
+        "source": "user",
+        "options": {},
+        "unique_id": None,
+        "discovery_keys": MappingProxyType({}),
+        "subentries_data": None,
+    }
+    return ConfigEntry(**{key: value for key, value in kwargs.items() if key in params})
+
+
+class LoopLagMonitor:
+    """Measure how long the event loop is blocked.""" # 量測事件循環被阻塞的時間。
+
+    def __init__(self, interval: float = 0.01) -> None:
+        self.interval = interval # 取樣間隔秒數。
+        self.lags = [] # 每次取樣超出預期的秒數。
+        self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.lags.append(loop.time() - start - self.interval)
+
+    def start(self) -> None:
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+
+    def report(self) -> dict:
+        """Summarize the measured lags.""" # 彙整量測到的延遲。
+        return {
+            "loop_lag_max_ms": round(max(self.lags, default=0) * 1000, 2),
+            "loop_lag_p99_ms": round(percentile(self.lags, 0.99) * 1000, 2),
+            "loop_blocked_over_50ms": sum(1 for lag in self.lags if lag > 0.05),
+        }
+
+
+def start_server(args: argparse.Namespace, port: int, siteids: list) -> subprocess.Popen:
+    """Start the replay server in a separate process.""" # 在獨立行程啟動重播伺服器，避免影響事件循環的量測。
+    cmd = [
+        sys.executable, os.path.join(ROOT, "scripts", "replay_server.py"),
+        "--port", str(port),
+        "--scale", str(args.scale),
+        "--latency", str(args.latency),
+        "--jitter", str(args.jitter),
+        "--error-rate", str(args.error_rate),
+        "--throttle", str(args.throttle),
+        "--publish-interval", str(args.publish_interval),
+    ]
+    if args.payload:
+        cmd += ["--payload", *args.payload]
+    else: # 沒有錄製資料時，為所有真實站點產生合成資料。
+        cmd += ["--siteids", ",".join(siteids)]
+    return subprocess.Popen(cmd)
+
+
+async def wait_for_states(hass, expected: int, timeout: float) -> int:
+    """Wait until the expected number of sensor states exist.""" # 等待預期數量的感測器狀態出現。
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        count = len(hass.states.async_entity_ids("sensor"))
+        if count >= expected:
+            return count
+        await asyncio.sleep(0.1)
+    return len(hass.states.async_entity_ids("sensor"))
+
+
+async def run(args: argparse.Namespace) -> dict:
+    """Run the simulation and return the report.""" # 執行模擬並返回報告。
+    report = {}
+    config_dir = tempfile.mkdtemp(prefix="taiwan_aqi_harness_")
+    os.symlink(os.path.join(ROOT, "custom_components"), os.path.join(config_dir, "custom_components"))
+    db_path = os.path.join(config_dir, "harness.db")
+    recorder = f"recorder:\n  db_url: sqlite:///{db_path}\n  commit_interval: 1\n" if args.recorder else ""
+    with open(os.path.join(config_dir, "configuration.yaml"), "w", encoding="utf-8") as file:
+        file.write(CONFIGURATION_YAML.format(http_port=free_port(), recorder=recorder))
+
+    server_port = free_port()
+    endpoint = args.server_url or f"http://127.0.0.1:{server_port}/api/v2/aqx_p_432"
+    base_siteids = list(SITEID_DICT.values())
+    server = None if args.server_url else start_server(args, server_port, base_siteids)
+    # 放大後的複製站點也建立實體，讓感測器平台及記錄器實際承受放大的負載
+    siteids = base_siteids + [
+        clone_siteid(s_id, k) for k in range(1, args.scale) for s_id in base_siteids
+    ]
+    await asyncio.sleep(1) # 等待重播伺服器啟動。
+
+    if args.tracemalloc:
+        tracemalloc.start()
+    monitor = LoopLagMonitor()
+    try:
+        hass = await bootstrap.async_setup_hass(RuntimeConfig(config_dir=config_dir, skip_pip=True))
+        await hass.async_start()
+        monitor.start() # 只統計整合設定及刷新期間的延遲，不含 Home Assistant 本身的啟動。
+
+        state_changes = 0
+
+        def count_state_change(event) -> None: # 統計狀態變更事件，即記錄器需要寫入的次數。
+            nonlocal state_changes
+            state_changes += 1
+
+        hass.bus.async_listen(EVENT_STATE_CHANGED, count_state_change)
+
+        # 將所有站點平均分配到各配置條目，避免實體唯一 ID 重複
+        pollutants = list(SENSOR_INFO) if args.all_pollutants else DEFAULT_POLLUTANTS
+        chunks = [siteids[i::args.entries] for i in range(args.entries)]
+        expected = len(siteids) * len(pollutants)
+
+        start = time.monotonic()
+        for index, chunk in enumerate(chunks):
+            entry = make_entry(index, {
+                CONF_API_KEY: "harness",
+                CONF_SITEID: chunk,
+                CONF_POLLUTANTS: pollutants,
+                CONF_ENDPOINTS: [endpoint],
+            })
+            await hass.config_entries.async_add(entry)
+        report["stations"] = len(siteids)
+        report["entities_expected"] = expected
+        report["entities_created"] = await wait_for_states(hass, expected, args.setup_timeout)
+        report["setup_seconds"] = round(time.monotonic() - start, 3)
+
+        coordinators = [data[COORDINATOR] for data in hass.data.get(DOMAIN, {}).values()]
+        latencies = []
+        for _ in range(args.rounds): # 每輪等待下一個發布時段後同時刷新所有協調器。
+            await asyncio.sleep(args.publish_interval)
+
+            async def timed_refresh(coordinator) -> None:
+                begin = time.monotonic()
+                await coordinator.async_refresh() # 包含抓取、解碼、索引及實體狀態寫入。
+                latencies.append(time.monotonic() - begin)
+
+            await asyncio.gather(*(timed_refresh(c) for c in coordinators))
+            await hass.async_block_till_done()
+
+        report["refresh_p50_ms"] = round(statistics.median(latencies) * 1000, 2) if latencies else 0
+        report["refresh_p95_ms"] = round(percentile(latencies, 0.95) * 1000, 2)
+        report["refresh_max_ms"] = round(max(latencies, default=0) * 1000, 2)
+        report["state_changes"] = state_changes
+        report.update(monitor.report())
+
+        if args.recorder: # 等待記錄器提交後統計寫入的狀態列數。
+            from homeassistant.components.recorder import get_instance
+
+            await get_instance(hass).async_block_till_done()
+            report["recorder_state_rows"] = await hass.async_add_executor_job(count_rows, db_path)
+
+        await hass.async_stop()
+    finally:
+        monitor.stop()
+        if server is not None:
+            server.terminate()
+
+    report["max_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    if args.tracemalloc:
+        current, peak = tracemalloc.get_traced_memory()
+        report["python_current_mb"] = round(current / 2**20, 1)
+        report["python_peak_mb"] = round(peak / 2**20, 1)
+        tracemalloc.stop()
+    return report
+
+
+def count_rows(db_path: str) -> int:
+    """Count the rows in the recorder states table.""" # 統計記錄器 states 資料表的列數。
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute("SELECT COUNT(*) FROM states").fetchone()[0]
+
+
+def parser() -> argparse.ArgumentParser:
+    """Command line options.""" # 命令列參數。
+    p = argparse.ArgumentParser(description=__doc__)
+    p.add_argument("--server-url", help="use a running replay server instead of starting one")
+    p.add_argument("--payload", nargs="*", help="recorded aqx_p_432 responses for the replay server")
+    p.add_argument("--scale", type=int, default=1, help="station multiplier, e.g. 10; clones get entities too")
+    p.add_argument("--latency", type=float, default=200, help="replay server mean latency in ms")
+    p.add_argument("--jitter", type=float, default=50, help="replay server latency standard deviation in ms")
+    p.add_argument("--error-rate", type=float, default=0.0, help="replay server error rate")
+    p.add_argument("--throttle", type=int, default=0, help="replay server requests per minute before 429")
+    p.add_argument("--publish-interval", type=float, default=5, help="seconds between publishtimes")
+    p.add_argument("--entries", type=int, default=1, help="config entries to split the stations across")
+    p.add_argument("--rounds", type=int, default=5, help="refresh rounds to measure")
+    p.add_argument("--all-pollutants", action="store_true", help="enable every sensor type")
+    p.add_argument("--recorder", action="store_true", help="enable the recorder and count written rows")
+    p.add_argument("--tracemalloc", action="store_true", help="trace Python allocations (slower)")
+    p.add_argument("--setup-timeout", type=float, default=120, help="seconds to wait for all entities")
+    p.add_argument("--json", action="store_true", help="print the report as JSON")
+    return p
+
+
+def main() -> None:
+    args = parser().parse_args()
+    report = asyncio.run(run(args))
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        for key, value in report.items():
+            print(f"{key:28} {value}")
+
+
+if __name__ == "__main__":
+    main()
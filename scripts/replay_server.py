@@ -0,0 +1,172 @@
+"""Local stand-in for the MOENV aqx_p_432 API.""" # 在本機模擬環境部 aqx_p_432 API，重播錄製的資料，不需要 API 金鑰或網路。
+
+from __future__ import annotations # 啟用延遲評估的型別提示。
+
+import argparse # 導入 argparse，用於解析命令列參數。
+import asyncio # 導入 asyncio，用於模擬延遲。
+import json # 導入 json，用於讀取錄製的資料及輸出回應。
+import logging # 導入 logging 模組，用於記錄日誌資訊。
+import random # 導入 random，用於產生合成站點、延遲抖動及錯誤。
+import time # 導入 time，用於計算發布時段及節流視窗。
+from collections import deque # 導入 deque，用於節流的滑動視窗。
+from copy import deepcopy # 導入 deepcopy，用於複製錄製的記錄。
+from datetime import datetime # 導入 datetime，用於產生發布時間。
+
+from aiohttp import web # 導入 aiohttp 的 web 模組，用於建立 HTTP 伺服器。
+
+_LOGGER = logging.getLogger(__name__) # 獲取此模組的日誌記錄器。
+
+PUBLISHTIME_FORMAT = "%Y/%m/%d %H:%M:%S" # API 使用的發布時間格式。
+NUMERIC_KEYS = [
+    "aqi", "so2", "so2_avg", "co", "co_8hr", "o3", "o3_8hr", "no2", "nox", "no",
+    "pm10", "pm10_avg", "pm2.5", "pm2.5_avg",
+] # 合成站點時會加入抖動的數值欄位。
+
+
+def synthetic_records(siteids: list[str]) -> list[dict]:
+    """Generate stations when no recording is available.""" # 沒有錄製資料時產生合成站點。
+    return [
+        {
+            "sitename": f"synthetic{siteid}",
+            "county": "synthetic",
+            "siteid": siteid,
+            "pollutant": "",
+            "status": "良好",
+            "longitude": f"{120 + random.random() * 2:.6f}",
+            "latitude": f"{22 + random.random() * 3:.6f}",
+            **{key: f"{random.uniform(0, 50):.1f}" for key in NUMERIC_KEYS},
+        }
+        for siteid in siteids
+    ]
+
+
+def clone_siteid(siteid: str, k: int) -> str:
+    """Site id of the k-th clone of a station.""" # 第 k 個複製站點的站點 ID。
+    return f"{siteid}-{k}"
+
+
+def jitter_values(record: dict) -> None:
+    """Scale the numeric values of a record by up to 10%.""" # 將記錄的數值欄位隨機調整至多 10%。
+    for key in NUMERIC_KEYS:
+        try:
+            record[key] = f"{float(record.get(key)) * random.uniform(0.9, 1.1):.1f}"
+        except (TypeError, ValueError): # 空值保持不變。
+            pass
+
+
+def scale_records(records: list[dict], scale: int) -> list[dict]:
+    """Clone every station scale-1 times with jittered values.""" # 將每個站點複製 scale-1 次並加入數值抖動。
+    scaled = list(records)
+    for k in range(1, scale):
+        for record in records:
+            clone = deepcopy(record)
+            clone["siteid"] = clone_siteid(record.get("siteid"), k)
+            clone["sitename"] = f"{record.get('sitename')}#{k}"
+            jitter_values(clone)
+            scaled.append(clone)
+    return scaled
+
+
+class ReplayServer:
+    """Serve recorded payloads with configurable latency, errors and throttling.""" # 以可設定的延遲、錯誤與節流重播錄製的資料。
+
+    def __init__(self, args: argparse.Namespace) -> None:
+        self.args = args
+        if args.payload: # 讀取錄製的資料，每個檔案是一次完整的 API 回應。
+            self.payloads = []
+            for path in args.payload:
+                with open(path, encoding="utf-8") as file:
+                    self.payloads.append(json.load(file))
+        else:
+            siteids = args.siteids.split(",") if args.siteids else [str(i) for i in range(1, args.synthetic + 1)]
+            self.payloads = [{"records": synthetic_records(siteids)}]
+        for payload in self.payloads:
+            payload["records"] = scale_records(payload.get("records", []), args.scale)
+        self.start = time.time() # 發布時段的起點。
+        self.requests = deque() # 節流視窗內的請求時間。
+        self.stats = {"requests": 0, "errors": 0, "throttled": 0} # 請求統計。
+        self._cache = (None, b"") # 目前發布時段的回應內容快取。
+
+    def _body(self) -> bytes:
+        """Return the payload of the current publish slot.""" # 返回目前發布時段的資料。
+        slot = int((time.time() - self.start) // self.args.publish_interval)
+        if self._cache[0] == slot: # 同一時段的回應只序列化一次。
+            return self._cache[1]
+        payload = deepcopy(self.payloads[slot % len(self.payloads)])
+        if not self.args.keep_publishtime: # 每個時段使用新的發布時間，模擬資料更新。
+            publishtime = datetime.fromtimestamp(
+                self.start + slot * self.args.publish_interval
+            ).strftime(PUBLISHTIME_FORMAT)
+            for record in payload["records"]:
+                record["publishtime"] = publishtime
+                if not self.args.payload: # 合成資料只有一份，每個時段調整數值，讓感測器狀態實際變更。
+                    jitter_values(record)
+        payload["total"] = str(len(payload["records"]))
+        body = json.dumps(payload, ensure_ascii=False).encode()
+        self._cache = (slot, body)
+        return body
+
+    async def handle(self, request: web.Request) -> web.Response:
+        """Answer one API request.""" # 回應一次 API 請求。
+        self.stats["requests"] += 1
+        if not request.query.get("api_key"):
+            return web.Response(status=403, text="api_key required")
+
+        now = time.monotonic()
+        while self.requests and now - self.requests[0] > 60: # 移除滑動視窗外的請求。
+            self.requests.popleft()
+        if self.args.throttle and len(self.requests) >= self.args.throttle:
+            self.stats["throttled"] += 1
+            return web.Response(status=429, text="too many requests")
+        self.requests.append(now)
+
+        delay = max(0.0, random.gauss(self.args.latency, self.args.jitter)) / 1000
+        await asyncio.sleep(delay) # 模擬上游延遲。
+        if random.random() < self.args.error_rate: # 模擬上游錯誤。
+            self.stats["errors"] += 1
+            return web.Response(status=500, text="simulated error")
+        return web.Response(body=self._body(), content_type="application/json")
+
+    async def handle_stats(self, request: web.Request) -> web.Response:
+        """Return the request statistics.""" # 返回請求統計。
+        return web.json_response(self.stats)
+
+    def app(self) -> web.Application:
+        """Build the aiohttp application.""" # 建立 aiohttp 應用程式。
+        app = web.Application()
+        app.router.add_get("/api/v2/aqx_p_432", self.handle)
+        app.router.add_get("/stats", self.handle_stats)
+        return app
+
+
+def parser() -> argparse.ArgumentParser:
+    """Command line options.""" # 命令列參數。
+    p = argparse.ArgumentParser(description=__doc__)
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8765)
+    p.add_argument("--payload", nargs="*", help="recorded aqx_p_432 responses, replayed in turn")
+    p.add_argument("--synthetic", type=int, default=85, help="stations to generate without a recording")
+    p.add_argument("--siteids", help="comma separated site ids to generate without a recording")
+    p.add_argument("--scale", type=int, default=1, help="multiply the number of stations")
+    p.add_argument("--latency", type=float, default=200, help="mean latency in ms")
+    p.add_argument("--jitter", type=float, default=50, help="latency standard deviation in ms")
+    p.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered with 500")
+    p.add_argument("--throttle", type=int, default=0, help="requests per minute before 429, 0 to disable")
+    p.add_argument("--publish-interval", type=float, default=3600, help="seconds between publishtimes")
+    p.add_argument("--keep-publishtime", action="store_true", help="serve the recorded publishtime")
+    return p
+
+
+def main() -> None:
+    args = parser().parse_args()
+    logging.basicConfig(level=logging.INFO)
+    server = ReplayServer(args)
+    _LOGGER.info(
+        f"serving {len(server.payloads[0]['records'])} stations on "
+        f"http://{args.host}:{args.port}/api/v2/aqx_p_432"
+    )
+    web.run_app(server.app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()